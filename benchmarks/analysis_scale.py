@@ -0,0 +1,83 @@
+"""Compare reduced-resolution difference analysis with the full-resolution path."""
+import argparse
+import json
+import os
+import tempfile
+from typing import Dict, List
+
+from benchmarks.synthetic import scene_starts, write_synthetic_video
+from extract.extract import extract_keyframes
+
+
+def _run_extract(video_path: str, work_dir: str, threshold: int, scale: float) -> Dict[str, object]:
+    tag = f"scale_{scale:g}"
+    timing_path = os.path.join(work_dir, f"{tag}.json")
+    result = extract_keyframes(
+        video_path=video_path,
+        output_folder=os.path.join(work_dir, tag),
+        timing_json_path=timing_path,
+        threshold=threshold,
+        analysis_scale=scale,
+    )
+    with open(timing_path, "r", encoding="utf-8") as file:
+        result["keyframes"] = scene_starts(json.load(file)["scenes"])
+    return result
+
+
+def run_benchmark(video_path: str, scales: List[float], threshold: int) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix="xfy_bench_") as work_dir:
+        baseline = _run_extract(video_path, work_dir, threshold, 1.0)
+        base_keys = set(baseline["keyframes"])
+        runs = []
+        for scale in scales:
+            result = _run_extract(video_path, work_dir, threshold, scale)
+            keys = set(result["keyframes"])
+            union = base_keys | keys
+            runs.append(
+                {
+                    "analysis_scale": scale,
+                    "elapsed_seconds": result["elapsed_seconds"],
+                    "speedup": baseline["elapsed_seconds"] / max(result["elapsed_seconds"], 1e-9),
+                    "saved_frames": result["saved_frames"],
+                    "agreement": len(base_keys & keys) / len(union) if union else 1.0,
+                    "missed_keyframes": len(base_keys - keys),
+                    "extra_keyframes": len(keys - base_keys),
+                }
+            )
+    return {
+        "video": video_path,
+        "threshold": threshold,
+        "total_frames": baseline["total_frames"],
+        "baseline": {"elapsed_seconds": baseline["elapsed_seconds"], "saved_frames": baseline["saved_frames"]},
+        "runs": runs,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark analysis_scale against full-resolution analysis.")
+    parser.add_argument("--video", default="", help="Source video. A synthetic 1080p clip is generated when omitted.")
+    parser.add_argument("--scales", default="0.5,0.25,0.125", help="Comma-separated analysis scales.")
+    parser.add_argument("--hold", type=int, default=3, help="Hold length of the synthetic clip (frames per drawing).")
+    parser.add_argument("--threshold", type=int, default=1_000_000, help="Full-resolution difference threshold.")
+    parser.add_argument("--output", default="", help="Write the JSON report here instead of stdout.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    scales = [float(value) for value in args.scales.split(",") if value.strip()]
+    with tempfile.TemporaryDirectory(prefix="xfy_video_") as video_dir:
+        video_path = args.video or write_synthetic_video(
+            os.path.join(video_dir, "synthetic.avi"), width=1920, height=1080, frame_count=240, hold=args.hold
+        )
+        report = run_benchmark(video_path, scales, args.threshold)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
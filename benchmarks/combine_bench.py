@@ -0,0 +1,198 @@
+"""
+Combine (render) throughput suite on synthetic processed-image sets.
+
+Each (image set, mode) case runs in its own interpreter so peak RSS is per
+case. Render time is split into decode, wait, resize and encode stages as
+reported by combine_frames. The JSON report can be diffed between commits
+with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+import cv2
+
+from benchmarks.extract_bench import RESOLUTIONS, _git_commit, _split
+from benchmarks.rss import peak_rss_bytes
+from benchmarks.synthetic import write_synthetic_project
+
+IMAGE_FORMATS = {"png": ".png", "jpg": ".jpg", "webp": ".webp", "bmp": ".bmp"}
+MODES: Dict[str, Dict[str, object]] = {
+    "serial": {"prefetch_depth": 0, "decode_cache_mb": 0},
+    "prefetch": {},
+    "pipe": {"backend": "ffmpeg-pipe"},
+    "vfr": {"backend": "ffmpeg-vfr"},
+    "chunks": {"chunks": 4},
+    "proxy": {"proxy_factor": 4},
+}
+# Modes that cannot run without an ffmpeg binary.
+FFMPEG_MODES = {"pipe", "vfr", "chunks"}
+
+
+def run_case(json_path: str, mode: str) -> Dict[str, object]:
+    from combine.combine import combine_frames
+
+    processed_dir = os.path.join(os.path.dirname(json_path), "processed")
+    with tempfile.TemporaryDirectory(prefix="xfy_bench_") as work_dir:
+        output_video = os.path.join(work_dir, "out.avi" if "proxy_factor" in MODES[mode] else "out.mp4")
+        result = combine_frames(json_path, processed_dir, output_video, **MODES[mode])
+        output_bytes = os.path.getsize(output_video) if os.path.exists(output_video) else 0
+    elapsed = float(result["elapsed_seconds"])
+    return {
+        "mode": mode,
+        "scenes_written": result["scenes_written"],
+        "frames_written": result["frames_written"],
+        "elapsed_seconds": elapsed,
+        "frames_per_second": result["frames_written"] / elapsed if elapsed > 0 else 0.0,
+        "scenes_per_second": result["scenes_written"] / elapsed if elapsed > 0 else 0.0,
+        "stage_seconds": result["stage_seconds"],
+        "decode_cache_hit_rate": result.get("decode_cache_hit_rate"),
+        "output_bytes": output_bytes,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def _run_case_subprocess(json_path: str, mode: str) -> Dict[str, object]:
+    command = [sys.executable, "-m", "benchmarks.combine_bench", "--run-case", json_path, mode]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark case {mode} on {json_path} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_suite(
+    resolutions: List[str],
+    holds: List[int],
+    scene_counts: List[int],
+    image_formats: List[str],
+    modes: List[str],
+) -> Dict[str, object]:
+    from combine.ffmpeg import find_ffmpeg
+
+    has_ffmpeg = find_ffmpeg() is not None
+    cases = []
+    with tempfile.TemporaryDirectory(prefix="xfy_sets_") as sets_dir:
+        for resolution in resolutions:
+            width, height = RESOLUTIONS[resolution]
+            for hold in holds:
+                for scene_count in scene_counts:
+                    for image_format in image_formats:
+                        image_set = f"{resolution}_on{hold}s_{scene_count}sc_{image_format}"
+                        json_path = write_synthetic_project(
+                            os.path.join(sets_dir, image_set),
+                            width=width,
+                            height=height,
+                            scene_count=scene_count,
+                            hold=hold,
+                            image_format=IMAGE_FORMATS[image_format],
+                        )
+                        for mode in modes:
+                            labels = {
+                                "image_set": image_set,
+                                "resolution": resolution,
+                                "hold": hold,
+                                "scene_count": scene_count,
+                                "image_format": image_format,
+                            }
+                            if mode in FFMPEG_MODES and not has_ffmpeg:
+                                cases.append({"mode": mode, "skipped": "ffmpeg not found", **labels})
+                                continue
+                            case = _run_case_subprocess(json_path, mode)
+                            case.update(labels)
+                            cases.append(case)
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": has_ffmpeg,
+        "cases": cases,
+    }
+
+
+def compare_reports(old: Dict[str, object], new: Dict[str, object]) -> List[Dict[str, object]]:
+    """Pair cases by (image set, mode) and report the frames/sec ratio new / old."""
+    old_cases = {_case_key(case): case for case in old["cases"] if "skipped" not in case}
+    rows = []
+    for case in new["cases"]:
+        previous = old_cases.get(_case_key(case))
+        if previous is None or "skipped" in case:
+            continue
+        rows.append(
+            {
+                "image_set": case["image_set"],
+                "mode": case["mode"],
+                "old_fps": previous["frames_per_second"],
+                "new_fps": case["frames_per_second"],
+                "speedup": case["frames_per_second"] / max(previous["frames_per_second"], 1e-9),
+                "frames_written_changed": case["frames_written"] != previous["frames_written"],
+                "old_stage_seconds": previous.get("stage_seconds"),
+                "new_stage_seconds": case.get("stage_seconds"),
+            }
+        )
+    return rows
+
+
+def _case_key(case: Dict[str, object]) -> Tuple[str, str]:
+    return str(case["image_set"]), str(case["mode"])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark combine throughput on synthetic image sets.")
+    parser.add_argument("--resolutions", default="720p,1080p", help=f"Comma-separated, from {list(RESOLUTIONS)}.")
+    parser.add_argument("--holds", default="1,3", help="Comma-separated hold lengths (frames per drawing).")
+    parser.add_argument("--scenes", default="120", help="Comma-separated scene counts.")
+    parser.add_argument("--formats", default="png,jpg", help=f"Comma-separated image formats, from {list(IMAGE_FORMATS)}.")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated, from {list(MODES)}.")
+    parser.add_argument("--output", default="", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two saved reports.")
+    parser.add_argument("--run-case", nargs=2, metavar=("TIMING_JSON", "MODE"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.run_case:
+        json_path, mode = args.run_case
+        print(json.dumps(run_case(json_path, mode)))
+        return
+
+    report: object
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, "r", encoding="utf-8") as file:
+                reports.append(json.load(file))
+        report = compare_reports(reports[0], reports[1])
+    else:
+        for mode in _split(args.modes):
+            if mode not in MODES:
+                raise ValueError(f"Unknown mode: {mode}")
+        for resolution in _split(args.resolutions):
+            if resolution not in RESOLUTIONS:
+                raise ValueError(f"Unknown resolution: {resolution}")
+        for image_format in _split(args.formats):
+            if image_format not in IMAGE_FORMATS:
+                raise ValueError(f"Unknown image format: {image_format}")
+        report = run_suite(
+            _split(args.resolutions),
+            [int(value) for value in _split(args.holds)],
+            [int(value) for value in _split(args.scenes)],
+            _split(args.formats),
+            _split(args.modes),
+        )
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Extraction throughput suite on synthetic clips.
+
+Each (clip, mode, frame format) case runs in its own interpreter so peak RSS
+is per case. Keyframe write time and size on disk are reported per format to
+show the encode-time vs. disk-size tradeoff. The JSON report can be diffed
+between commits with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+from benchmarks.rss import peak_rss_bytes
+from benchmarks.synthetic import write_synthetic_video
+from extract.formats import frame_format_spec
+
+RESOLUTIONS = {"360p": (640, 360), "720p": (1280, 720), "1080p": (1920, 1080)}
+MODES: Dict[str, Dict[str, object]] = {
+    "serial": {},
+    "pipelined": {"writer_workers": 3},
+    "segments": {"processes": 4},
+    "scale": {"analysis_scale": 0.25},
+    "sampled": {"sample_step": 12},
+}
+
+
+def run_case(video_path: str, mode: str, threshold: int, frame_format: str) -> Dict[str, object]:
+    from extract.extract import extract_keyframes
+
+    with tempfile.TemporaryDirectory(prefix="xfy_bench_") as work_dir:
+        frames_dir = os.path.join(work_dir, "frames")
+        result = extract_keyframes(
+            video_path=video_path,
+            output_folder=frames_dir,
+            timing_json_path=os.path.join(work_dir, "timing.json"),
+            threshold=threshold,
+            frame_format=frame_format,
+            **MODES[mode],
+        )
+        disk_bytes = sum(entry.stat().st_size for entry in os.scandir(frames_dir) if entry.is_file())
+    elapsed = float(result["elapsed_seconds"])
+    saved_frames = int(result["saved_frames"])
+    return {
+        "mode": mode,
+        "frame_format": frame_format,
+        "total_frames": result["total_frames"],
+        "saved_frames": saved_frames,
+        "elapsed_seconds": elapsed,
+        "frames_per_second": result["total_frames"] / elapsed if elapsed > 0 else 0.0,
+        "stage_seconds": result["stage_seconds"],
+        "scanned_fraction": result["scanned_fraction"],
+        "write_ms_per_keyframe": 1000.0 * result["stage_seconds"]["write"] / max(saved_frames, 1),
+        "disk_bytes": disk_bytes,
+        "bytes_per_keyframe": disk_bytes / max(saved_frames, 1),
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def _run_case_subprocess(video_path: str, mode: str, threshold: int, frame_format: str) -> Dict[str, object]:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.extract_bench",
+        "--run-case",
+        video_path,
+        mode,
+        str(threshold),
+        frame_format,
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark case {mode} on {video_path} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_suite(
+    resolutions: List[str],
+    holds: List[int],
+    lengths: List[int],
+    modes: List[str],
+    threshold: int,
+    frame_formats: List[str],
+) -> Dict[str, object]:
+    cases = []
+    with tempfile.TemporaryDirectory(prefix="xfy_videos_") as video_dir:
+        for resolution in resolutions:
+            width, height = RESOLUTIONS[resolution]
+            for hold in holds:
+                for length in lengths:
+                    clip = f"{resolution}_on{hold}s_{length}f"
+                    video_path = write_synthetic_video(
+                        os.path.join(video_dir, f"{clip}.avi"), width=width, height=height, frame_count=length, hold=hold
+                    )
+                    for mode in modes:
+                        for frame_format in frame_formats:
+                            case = _run_case_subprocess(video_path, mode, threshold, frame_format)
+                            case.update({"clip": clip, "resolution": resolution, "hold": hold, "length": length})
+                            cases.append(case)
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "cpu_count": os.cpu_count(),
+        "threshold": threshold,
+        "cases": cases,
+    }
+
+
+def compare_reports(old: Dict[str, object], new: Dict[str, object]) -> List[Dict[str, object]]:
+    """Pair cases by (clip, mode, frame format) and report the frames/sec ratio new / old."""
+    old_cases = {_case_key(case): case for case in old["cases"]}
+    rows = []
+    for case in new["cases"]:
+        previous = old_cases.get(_case_key(case))
+        if previous is None:
+            continue
+        rows.append(
+            {
+                "clip": case["clip"],
+                "mode": case["mode"],
+                "frame_format": _case_key(case)[2],
+                "old_fps": previous["frames_per_second"],
+                "new_fps": case["frames_per_second"],
+                "speedup": case["frames_per_second"] / max(previous["frames_per_second"], 1e-9),
+                "saved_frames_changed": case["saved_frames"] != previous["saved_frames"],
+                "old_peak_rss_bytes": previous.get("peak_rss_bytes"),
+                "new_peak_rss_bytes": case.get("peak_rss_bytes"),
+            }
+        )
+    return rows
+
+
+def _case_key(case: Dict[str, object]) -> Tuple[str, str, str]:
+    # Reports written before the format axis existed only contain PNG runs.
+    return str(case["clip"]), str(case["mode"]), str(case.get("frame_format", "png"))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except OSError:
+        return None
+    if completed.returncode != 0:
+        return None
+    return completed.stdout.strip() or None
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark keyframe extraction throughput on synthetic clips.")
+    parser.add_argument("--resolutions", default="360p,720p,1080p", help=f"Comma-separated, from {list(RESOLUTIONS)}.")
+    parser.add_argument("--holds", default="1,2,3", help="Comma-separated hold lengths (frames per drawing).")
+    parser.add_argument("--lengths", default="240", help="Comma-separated clip lengths in frames.")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated, from {list(MODES)}.")
+    parser.add_argument("--formats", default="png", help="Comma-separated keyframe formats, e.g. png,png-small,webp,bmp.")
+    parser.add_argument("--threshold", type=int, default=1_000_000, help="Difference threshold.")
+    parser.add_argument("--output", default="", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two saved reports.")
+    parser.add_argument("--run-case", nargs=4, metavar=("VIDEO", "MODE", "THRESHOLD", "FORMAT"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.run_case:
+        video_path, mode, threshold, frame_format = args.run_case
+        print(json.dumps(run_case(video_path, mode, int(threshold), frame_format)))
+        return
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, "r", encoding="utf-8") as file:
+                reports.append(json.load(file))
+        report: object = compare_reports(reports[0], reports[1])
+    else:
+        for mode in _split(args.modes):
+            if mode not in MODES:
+                raise ValueError(f"Unknown mode: {mode}")
+        for resolution in _split(args.resolutions):
+            if resolution not in RESOLUTIONS:
+                raise ValueError(f"Unknown resolution: {resolution}")
+        for frame_format in _split(args.formats):
+            frame_format_spec(frame_format)
+        report = run_suite(
+            _split(args.resolutions),
+            [int(value) for value in _split(args.holds)],
+            [int(value) for value in _split(args.lengths)],
+            _split(args.modes),
+            args.threshold,
+            _split(args.formats),
+        )
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Steady-state memory of keyframe extraction over a long synthetic clip.
+
+Resident memory is sampled from the progress callback. After a warm-up share
+of the clip, RSS should stay flat: growth_bytes and the fitted slope per 1000
+frames are reported per mode, each mode in a fresh interpreter.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.rss import current_rss_bytes, peak_rss_bytes
+from benchmarks.synthetic import write_synthetic_video
+
+MODES: Dict[str, Dict[str, object]] = {
+    "serial": {},
+    "pipelined": {"writer_workers": 3},
+    "scale": {"analysis_scale": 0.25},
+}
+
+
+def run_mode(video_path: str, mode: str, threshold: int, sample_every: int, warmup: float) -> Dict[str, object]:
+    from extract.extract import extract_keyframes
+
+    samples: List[List[int]] = []
+
+    def on_progress(current: int, total: int) -> None:
+        if current % sample_every == 0:
+            rss = current_rss_bytes()
+            if rss is not None:
+                samples.append([current, rss])
+
+    with tempfile.TemporaryDirectory(prefix="xfy_mem_") as work_dir:
+        result = extract_keyframes(
+            video_path=video_path,
+            output_folder=os.path.join(work_dir, "frames"),
+            timing_json_path=os.path.join(work_dir, "timing.json"),
+            threshold=threshold,
+            progress_callback=on_progress,
+            **MODES[mode],
+        )
+
+    report: Dict[str, object] = {
+        "mode": mode,
+        "total_frames": result["total_frames"],
+        "saved_frames": result["saved_frames"],
+        "elapsed_seconds": result["elapsed_seconds"],
+        "peak_rss_bytes": peak_rss_bytes(),
+        "samples": samples,
+    }
+    steady = [sample for sample in samples if sample[0] >= warmup * result["total_frames"]]
+    if len(steady) >= 2:
+        frames = np.array([sample[0] for sample in steady], dtype=np.float64)
+        rss = np.array([sample[1] for sample in steady], dtype=np.float64)
+        report["steady_rss_bytes"] = int(rss[0])
+        report["growth_bytes"] = int(rss.max() - rss[0])
+        report["slope_bytes_per_1000_frames"] = float(np.polyfit(frames, rss, 1)[0] * 1000)
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check that extraction memory stays flat over a long clip.")
+    parser.add_argument("--video", default="", help="Source video. A synthetic clip is generated when omitted.")
+    parser.add_argument("--width", type=int, default=1920, help="Synthetic clip width.")
+    parser.add_argument("--height", type=int, default=1080, help="Synthetic clip height.")
+    parser.add_argument("--frames", type=int, default=3000, help="Synthetic clip length in frames.")
+    parser.add_argument("--hold", type=int, default=2, help="Synthetic clip hold length.")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated, from {list(MODES)}.")
+    parser.add_argument("--threshold", type=int, default=1_000_000, help="Difference threshold.")
+    parser.add_argument("--sample-every", type=int, default=50, help="Sample RSS every N frames.")
+    parser.add_argument("--warmup", type=float, default=0.2, help="Share of the clip excluded as warm-up.")
+    parser.add_argument("--output", default="", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--run-mode", nargs=2, metavar=("VIDEO", "MODE"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.run_mode:
+        video_path, mode = args.run_mode
+        print(json.dumps(run_mode(video_path, mode, args.threshold, args.sample_every, args.warmup)))
+        return
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    for mode in modes:
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="xfy_video_") as video_dir:
+        video_path = args.video or write_synthetic_video(
+            os.path.join(video_dir, "long.avi"),
+            width=args.width,
+            height=args.height,
+            frame_count=args.frames,
+            hold=args.hold,
+        )
+        for mode in modes:
+            command = [
+                sys.executable,
+                "-m",
+                "benchmarks.memory_bench",
+                "--run-mode",
+                video_path,
+                mode,
+                "--threshold",
+                str(args.threshold),
+                "--sample-every",
+                str(args.sample_every),
+                "--warmup",
+                str(args.warmup),
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                raise RuntimeError(f"Memory benchmark mode {mode} failed:\n{completed.stderr}")
+            runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    text = json.dumps({"video": args.video or "synthetic", "threshold": args.threshold, "runs": runs}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
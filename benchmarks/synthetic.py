@@ -0,0 +1,95 @@
+import json
+import os
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+
+def write_synthetic_video(
+    video_path: str,
+    width: int = 1280,
+    height: int = 720,
+    frame_count: int = 240,
+    hold: int = 2,
+    fps: float = 24.0,
+    seed: int = 0,
+) -> str:
+    """
+    Write a deterministic anime-style clip: flat cel shapes with outlines that
+    change every `hold` frames, plus light sensor-like noise on every frame.
+    """
+    os.makedirs(os.path.dirname(video_path) or ".", exist_ok=True)
+    out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    if not out.isOpened():
+        raise RuntimeError(f"Unable to create video: {video_path}")
+
+    rng = np.random.default_rng(seed)
+    background = _background(width, height)
+    drawing = background
+    for idx in range(frame_count):
+        if idx % max(hold, 1) == 0:
+            drawing = _draw_cels(rng, background)
+        noise = rng.integers(0, 3, (height, width, 1), dtype=np.uint8)
+        out.write(cv2.add(drawing, np.repeat(noise, 3, axis=2)))
+    out.release()
+    return video_path
+
+
+def write_synthetic_project(
+    project_dir: str,
+    width: int = 1280,
+    height: int = 720,
+    scene_count: int = 100,
+    hold: int = 2,
+    image_format: str = ".png",
+    fps: float = 24.0,
+    seed: int = 0,
+) -> str:
+    """
+    Write a combine input set: scene_count processed drawings named 00000,
+    00001... in project_dir/processed, and project_dir/timing.json holding each
+    for `hold` frames. Returns the timing.json path.
+    """
+    processed_dir = os.path.join(project_dir, "processed")
+    os.makedirs(processed_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    background = _background(width, height)
+    scenes = []
+    for idx in range(scene_count):
+        filename = f"{idx:05d}{image_format}"
+        if not cv2.imwrite(os.path.join(processed_dir, filename), _draw_cels(rng, background)):
+            raise RuntimeError(f"Unable to write image: {filename}")
+        scenes.append({"filename": filename, "duration_frames": max(hold, 1)})
+    json_path = os.path.join(project_dir, "timing.json")
+    with open(json_path, "w", encoding="utf-8") as file:
+        json.dump({"fps": fps, "scenes": scenes}, file, indent=2)
+    return json_path
+
+
+def _background(width: int, height: int) -> np.ndarray:
+    background = np.empty((height, width, 3), dtype=np.uint8)
+    background[:] = (228, 214, 196)
+    return background
+
+
+def _draw_cels(rng: np.random.Generator, background: np.ndarray) -> np.ndarray:
+    height, width = background.shape[:2]
+    unit = max(8, min(width, height) // 8)
+    drawing = background.copy()
+    for _ in range(5):
+        x = int(rng.integers(0, max(1, width - 2 * unit)))
+        y = int(rng.integers(0, max(1, height - 2 * unit)))
+        color = tuple(int(c) for c in rng.integers(30, 230, 3))
+        cv2.ellipse(drawing, (x + unit, y + unit), (unit, unit // 2), 0, 0, 360, color, -1, cv2.LINE_AA)
+        cv2.ellipse(drawing, (x + unit, y + unit), (unit, unit // 2), 0, 0, 360, (20, 20, 20), 2, cv2.LINE_AA)
+    return drawing
+
+
+def scene_starts(scenes: List[Dict[str, object]]) -> List[int]:
+    starts = []
+    position = 0
+    for scene in scenes:
+        starts.append(position)
+        position += int(scene.get("duration_frames", 1))
+    return starts
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from combine.chunks import render_segments
+from combine.decode_cache import DecodedImageCache
+from combine.ffmpeg import EncoderOptions, concat_copy, require_ffmpeg
+from combine.normalize import DEFAULT_NORMALIZE_MODE
+from combine.render import SceneEntry
+
+ProgressCallback = Callable[[int, int], None]
+
+CACHE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+SEGMENT_SCENES = 24
+
+
+def render_cached(
+    entries: Sequence[SceneEntry],
+    output_video: str,
+    fps: float,
+    size: Tuple[int, int],
+    cache_dir: str,
+    backend: str = "opencv",
+    processes: int = 1,
+    prefetch_depth: int = 4,
+    decode_workers: int = 0,
+    progress_callback: Optional[ProgressCallback] = None,
+    image_cache: Optional[DecodedImageCache] = None,
+    stage_seconds: Optional[Dict[str, float]] = None,
+    normalize: str = DEFAULT_NORMALIZE_MODE,
+    encoder: Optional[EncoderOptions] = None,
+    prune: bool = True,
+) -> Dict[str, int]:
+    """
+    Render through a segment cache and join the segments without re-encoding.
+
+    Scenes are grouped into fixed runs of SEGMENT_SCENES. A segment is keyed by
+    the content hashes of its images, their durations and the render settings,
+    so only segments whose drawings or timings changed are encoded again;
+    the rest are reused from cache_dir. Image hashes are remembered by file
+    size and modification time to avoid re-reading unchanged files.
+    With prune, segments no longer referenced by the latest render are
+    deleted; partial renders (e.g. a frame range) pass prune=False so the
+    segments of the full timeline survive.
+
+    stage_seconds accumulates the render stages of changed segments plus
+    "hash" and "concat".
+    """
+    stage_seconds = stage_seconds if stage_seconds is not None else {}
+    ffmpeg = require_ffmpeg()
+    segments_dir = os.path.join(cache_dir, "segments")
+    os.makedirs(segments_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir)
+    known_images: Dict[str, Dict[str, object]] = manifest.get("images", {})
+    image_records: Dict[str, Dict[str, object]] = {}
+
+    _, extension = os.path.splitext(output_video)
+    extension = extension or ".mp4"
+    segment_paths: List[str] = []
+    segment_records: List[Dict[str, object]] = []
+    jobs: List[Tuple[List[SceneEntry], str]] = []
+    cached_scenes = 0
+    started = time.perf_counter()
+    for start in range(0, len(entries), SEGMENT_SCENES):
+        segment_entries = list(entries[start : start + SEGMENT_SCENES])
+        image_hashes = [_image_hash(image_path, known_images, image_records) for image_path, _ in segment_entries]
+        key = _segment_key(segment_entries, image_hashes, backend, fps, size, normalize, encoder)
+        segment_path = os.path.join(segments_dir, f"{key}{extension}")
+        segment_paths.append(segment_path)
+        segment_records.append({"key": key, "start": start, "scenes": len(segment_entries)})
+        if os.path.exists(segment_path):
+            cached_scenes += len(segment_entries)
+        else:
+            jobs.append((segment_entries, segment_path + ".partial" + extension))
+
+    stage_seconds["hash"] = stage_seconds.get("hash", 0.0) + time.perf_counter() - started
+
+    if progress_callback is not None and cached_scenes:
+        progress_callback(cached_scenes, len(entries))
+    results = render_segments(
+        jobs,
+        fps,
+        size,
+        backend,
+        processes,
+        prefetch_depth,
+        decode_workers,
+        progress_callback,
+        cached_scenes,
+        len(entries),
+        image_cache,
+        stage_seconds,
+        normalize,
+        encoder,
+    )
+    for _, partial_path in jobs:
+        os.replace(partial_path, partial_path[: -len(".partial" + extension)])
+
+    started = time.perf_counter()
+    concat_copy(segment_paths, output_video, fps, ffmpeg)
+    stage_seconds["concat"] = stage_seconds.get("concat", 0.0) + time.perf_counter() - started
+
+    if not prune:
+        _save_manifest(
+            cache_dir,
+            {
+                "version": CACHE_VERSION,
+                "images": {**known_images, **image_records},
+                "segments": manifest.get("segments", []),
+            },
+        )
+    else:
+        _save_manifest(
+            cache_dir, {"version": CACHE_VERSION, "images": image_records, "segments": segment_records}
+        )
+        referenced = {os.path.basename(path) for path in segment_paths}
+        for file_name in os.listdir(segments_dir):
+            if file_name not in referenced:
+                try:
+                    os.remove(os.path.join(segments_dir, file_name))
+                except OSError:
+                    pass
+
+    return {
+        "segments": len(segment_paths),
+        "cached_segments": len(segment_paths) - len(jobs),
+        "rendered_segments": len(jobs),
+        "scenes_rendered": sum(scenes for scenes, _ in results),
+    }
+
+
+def _image_hash(
+    image_path: str,
+    known_images: Dict[str, Dict[str, object]],
+    image_records: Dict[str, Dict[str, object]],
+) -> str:
+    try:
+        stat = os.stat(image_path)
+    except OSError:
+        return "missing"
+    record = known_images.get(image_path)
+    if not (record and record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns):
+        digest = hashlib.blake2b(digest_size=16)
+        with open(image_path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest.hexdigest()}
+    image_records[image_path] = record
+    return str(record["hash"])
+
+
+def _segment_key(
+    segment_entries: Sequence[SceneEntry],
+    image_hashes: Sequence[str],
+    backend: str,
+    fps: float,
+    size: Tuple[int, int],
+    normalize: str,
+    encoder: Optional[EncoderOptions],
+) -> str:
+    description: Dict[str, object] = {
+        "version": CACHE_VERSION,
+        "backend": backend,
+        "fps": fps,
+        "size": list(size),
+        "normalize": normalize,
+        "scenes": [[image_hash, duration] for image_hash, (_, duration) in zip(image_hashes, segment_entries)],
+    }
+    if encoder is not None:
+        description["encoder"] = asdict(encoder)
+    return hashlib.blake2b(json.dumps(description, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _load_manifest(cache_dir: str) -> Dict[str, object]:
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != CACHE_VERSION:
+        return {}
+    return manifest
+
+
+def _save_manifest(cache_dir: str, manifest: Dict[str, object]) -> None:
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
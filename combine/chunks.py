@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from combine.decode_cache import DecodedImageCache
+from combine.ffmpeg import EncoderOptions, concat_copy, require_ffmpeg
+from combine.normalize import DEFAULT_NORMALIZE_MODE
+from combine.render import SceneEntry, render_scenes
+
+ProgressCallback = Callable[[int, int], None]
+
+MIN_CHUNK_SCENES = 8
+
+_progress_counter = None
+
+
+def plan_chunks(scene_count: int, chunks: int) -> List[Tuple[int, int]]:
+    """Split [0, scene_count) into contiguous scene ranges of roughly equal size."""
+    count = max(1, min(chunks, scene_count // MIN_CHUNK_SCENES))
+    bounds = [scene_count * idx // count for idx in range(count + 1)]
+    return [(bounds[idx], bounds[idx + 1]) for idx in range(count)]
+
+
+def render_chunks(
+    entries: Sequence[SceneEntry],
+    output_video: str,
+    fps: float,
+    size: Tuple[int, int],
+    chunks: int,
+    backend: str = "opencv",
+    prefetch_depth: int = 4,
+    decode_workers: int = 0,
+    progress_callback: Optional[ProgressCallback] = None,
+    stage_seconds: Optional[Dict[str, float]] = None,
+    normalize: str = DEFAULT_NORMALIZE_MODE,
+    encoder: Optional[EncoderOptions] = None,
+) -> Tuple[int, int, int]:
+    """
+    Render contiguous scene ranges in parallel processes, then join the
+    segments with ffmpeg's concat demuxer without re-encoding.
+
+    Every segment starts on a keyframe and ends exactly after its last held
+    frame, so the joined timeline has the same frames and timing as a single
+    render. Returns (scenes_written, frames_written, chunk_count).
+
+    stage_seconds accumulates the workers' stages plus "concat".
+    """
+    stage_seconds = stage_seconds if stage_seconds is not None else {}
+    ffmpeg = require_ffmpeg()
+    ranges = plan_chunks(len(entries), chunks)
+    _, extension = os.path.splitext(output_video)
+    staging_dir = tempfile.mkdtemp(prefix=".chunks_", dir=os.path.dirname(os.path.abspath(output_video)))
+    try:
+        segment_paths = [os.path.join(staging_dir, f"{idx:04d}{extension or '.mp4'}") for idx in range(len(ranges))]
+        jobs = [(list(entries[start:stop]), segment_path) for (start, stop), segment_path in zip(ranges, segment_paths)]
+        results = render_segments(
+            jobs,
+            fps,
+            size,
+            backend,
+            len(ranges),
+            prefetch_depth,
+            decode_workers,
+            progress_callback,
+            0,
+            len(entries),
+            stage_seconds=stage_seconds,
+            normalize=normalize,
+            encoder=encoder,
+        )
+        started = time.perf_counter()
+        concat_copy(segment_paths, output_video, fps, ffmpeg)
+        stage_seconds["concat"] = stage_seconds.get("concat", 0.0) + time.perf_counter() - started
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    scenes_written = sum(scenes for scenes, _ in results)
+    frames_written = sum(frames for _, frames in results)
+    return scenes_written, frames_written, len(ranges)
+
+
+def render_segments(
+    jobs: Sequence[Tuple[List[SceneEntry], str]],
+    fps: float,
+    size: Tuple[int, int],
+    backend: str,
+    processes: int,
+    prefetch_depth: int = 4,
+    decode_workers: int = 0,
+    progress_callback: Optional[ProgressCallback] = None,
+    progress_offset: int = 0,
+    progress_total: int = 0,
+    image_cache: Optional[DecodedImageCache] = None,
+    stage_seconds: Optional[Dict[str, float]] = None,
+    normalize: str = DEFAULT_NORMALIZE_MODE,
+    encoder: Optional[EncoderOptions] = None,
+) -> List[Tuple[int, int]]:
+    """
+    Render each (entries, segment path) job to its own file, in up to processes
+    worker processes. Progress counts scenes, starting at progress_offset.
+    image_cache is only used when the jobs run in this process. stage_seconds
+    accumulates render stages summed over all jobs.
+
+    Returns (scenes_written, frames_written) per job.
+    """
+    if processes <= 1 or len(jobs) <= 1:
+        results = []
+        done = progress_offset
+        for job_entries, segment_path in jobs:
+
+            def on_progress(current: int, total: int, base: int = done) -> None:
+                if progress_callback is not None:
+                    progress_callback(base + current, progress_total)
+
+            results.append(
+                render_scenes(
+                    job_entries,
+                    segment_path,
+                    fps,
+                    size,
+                    backend,
+                    prefetch_depth,
+                    decode_workers,
+                    on_progress,
+                    image_cache,
+                    stage_seconds,
+                    normalize,
+                    encoder,
+                )
+            )
+            done += len(job_entries)
+        return results
+
+    context = multiprocessing.get_context("spawn")
+    counter = context.Value("q", 0)
+    with ProcessPoolExecutor(
+        max_workers=min(processes, len(jobs)), mp_context=context, initializer=_init_worker, initargs=(counter,)
+    ) as pool:
+        futures = [
+            pool.submit(
+                _render_chunk,
+                job_entries,
+                segment_path,
+                fps,
+                size,
+                backend,
+                prefetch_depth,
+                decode_workers,
+                normalize,
+                encoder,
+            )
+            for job_entries, segment_path in jobs
+        ]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=0.2)
+            if progress_callback is not None:
+                progress_callback(min(progress_offset + int(counter.value), progress_total), progress_total)
+        results = []
+        for future in futures:
+            scenes_written, frames_written, job_stages = future.result()
+            if stage_seconds is not None:
+                for stage, seconds in job_stages.items():
+                    stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+            results.append((scenes_written, frames_written))
+        return results
+
+
+def _init_worker(counter) -> None:
+    global _progress_counter
+    _progress_counter = counter
+
+
+def _render_chunk(
+    entries: List[SceneEntry],
+    segment_path: str,
+    fps: float,
+    size: Tuple[int, int],
+    backend: str,
+    prefetch_depth: int,
+    decode_workers: int,
+    normalize: str,
+    encoder: Optional[EncoderOptions],
+) -> Tuple[int, int, Dict[str, float]]:
+    reported = [0]
+
+    def on_progress(current: int, total: int) -> None:
+        if _progress_counter is None or current <= reported[0]:
+            return
+        with _progress_counter.get_lock():
+            _progress_counter.value += current - reported[0]
+        reported[0] = current
+
+    stage_seconds: Dict[str, float] = {}
+    scenes_written, frames_written = render_scenes(
+        entries,
+        segment_path,
+        fps,
+        size,
+        backend,
+        prefetch_depth,
+        decode_workers,
+        on_progress,
+        stage_seconds=stage_seconds,
+        normalize=normalize,
+        encoder=encoder,
+    )
+    return scenes_written, frames_written, stage_seconds
@@ -2,19 +2,108 @@ import argparse
 import json
 import os
 import time
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, List, Optional
 
 import cv2
 
+from combine.cache import render_cached
+from combine.chunks import plan_chunks, render_chunks
+from combine.decode_cache import DEFAULT_DECODE_CACHE_MB, DecodedImageCache
+from combine.ffmpeg import ENCODER_CODECS, ENCODER_PRESETS, EncoderOptions, find_encoder, require_ffmpeg
+from combine.normalize import DEFAULT_NORMALIZE_MODE, NORMALIZE_MODES, preflight_sizes, size_mismatches
+from combine.render import (
+    COMBINE_BACKENDS,
+    PROXY_FOURCC,
+    PROXY_IMREAD_FLAGS,
+    SceneEntry,
+    render_opencv,
+    render_scenes,
+)
+
 ProgressCallback = Callable[[int, int], None]
 
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+
 
 def combine_frames(
     json_path: str,
     processed_folder: str,
     output_video: str,
     progress_callback: Optional[ProgressCallback] = None,
+    prefetch_depth: int = 4,
+    decode_workers: int = 0,
+    backend: str = "opencv",
+    chunks: int = 1,
+    cache_dir: Optional[str] = None,
+    proxy_factor: int = 1,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    decode_cache_mb: int = DEFAULT_DECODE_CACHE_MB,
+    normalize: str = DEFAULT_NORMALIZE_MODE,
+    encoder: Optional[EncoderOptions] = None,
 ) -> Dict[str, object]:
+    """
+    Render processed keyframes into a video, holding each for its scene duration.
+
+    Images are decoded in scene order by decode_workers threads (0 = automatic)
+    up to prefetch_depth frames ahead of the encoder, so decoding overlaps
+    encoding while at most prefetch_depth decoded frames wait in memory.
+    prefetch_depth 0 decodes on the encoding thread.
+
+    backend "ffmpeg-vfr" hands the images to ffmpeg instead, which encodes each
+    scene once and stores its duration as presentation time, so render time
+    follows the scene count rather than the frame count.
+
+    backend "ffmpeg-pipe" writes the same frames as "opencv" but streams them
+    raw to a multithreaded x264/x265 process; encoder sets codec, preset, CRF
+    and encoder threads (also used by "ffmpeg-vfr"). Without ffmpeg or the
+    requested encoder it falls back to "opencv" and reports encoder_fallback.
+
+    chunks > 1 renders contiguous scene ranges in that many processes and joins
+    them with ffmpeg without re-encoding (see combine.chunks); frame count and
+    timing match a single render.
+
+    cache_dir enables incremental re-rendering: scenes are encoded in cached
+    segments keyed by image content and duration, and only segments whose
+    inputs changed are encoded again (see combine.cache). chunks then sets how
+    many processes encode the changed segments.
+
+    proxy_factor 2, 4 or 8 renders a timing-review proxy instead: images are
+    decoded at 1/proxy_factor of their size with OpenCV's reduced decode flags
+    and written with the intra-only MJPG codec, so output_video should be .avi.
+
+    start_frame/end_frame (end exclusive, None = end of timeline) render only
+    that window of the timeline; scenes outside it are not decoded and scenes
+    cut by it are shortened.
+
+    decode_cache_mb bounds an LRU of decoded images keyed by file content, so
+    scenes repeating a drawing reuse one decode (0 disables it). It applies to
+    OpenCV rendering in this process, not to chunk workers or ffmpeg.
+
+    The output size is that of the first processed image. Before encoding, a
+    preflight scan reads only the image headers to find images of another size;
+    normalize decides how they are brought to the output size on the decode
+    threads ("fit", "crop", "pad", "stretch"), or "error" fails right away.
+
+    The result's stage_seconds splits render time into decode, wait, resize and
+    encode (plus hash/concat for cached or chunked renders).
+    """
+    if backend not in COMBINE_BACKENDS:
+        raise ValueError(f"Unknown combine backend: {backend}")
+    if normalize not in NORMALIZE_MODES:
+        raise ValueError(f"Unknown normalize mode: {normalize}")
+    if proxy_factor != 1:
+        if proxy_factor not in PROXY_IMREAD_FLAGS:
+            raise ValueError(f"proxy_factor must be 1 or one of {sorted(PROXY_IMREAD_FLAGS)}")
+        if backend != "opencv" or chunks > 1 or cache_dir:
+            raise ValueError("proxy_factor cannot be combined with an ffmpeg backend, chunks or cache_dir")
+    encoder = encoder or EncoderOptions()
+    encoder.validate()
+    encoder_fallback = False
+    if backend == "ffmpeg-pipe" and find_encoder(encoder) is None:
+        backend, encoder_fallback = "opencv", True
+    if start_frame < 0 or (end_frame is not None and end_frame <= start_frame):
+        raise ValueError(f"Invalid frame range: {start_frame}-{end_frame}")
     if not os.path.exists(json_path):
         raise FileNotFoundError(f"Timing json not found: {json_path}")
     if not os.path.isdir(processed_folder):
@@ -29,43 +118,120 @@ def combine_frames(
     processed_files = sorted(
         file_name
         for file_name in os.listdir(processed_folder)
-        if file_name.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".webp"))
+        if file_name.lower().endswith(IMAGE_EXTENSIONS)
     )
 
     if not processed_files:
         raise RuntimeError("No processed images found.")
 
     first_img_path = os.path.join(processed_folder, processed_files[0])
-    first_img = cv2.imread(first_img_path)
+    imread_flags = PROXY_IMREAD_FLAGS.get(proxy_factor, cv2.IMREAD_COLOR)
+    first_img = cv2.imread(first_img_path, imread_flags)
     if first_img is None:
         raise RuntimeError(f"Unable to read first image: {first_img_path}")
 
     height, width, _ = first_img.shape
     os.makedirs(os.path.dirname(output_video) or ".", exist_ok=True)
 
-    start_time = time.time()
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
-
-    scenes_written = 0
-    for idx, scene in enumerate(scenes):
-        if idx >= len(processed_files):
-            break
-
-        img_path = os.path.join(processed_folder, processed_files[idx])
-        frame = cv2.imread(img_path)
-        if frame is None:
-            continue
+    image_paths = [os.path.join(processed_folder, file_name) for file_name in processed_files[: len(scenes)]]
+    entries = [
+        (image_path, max(int(scene.get("duration_frames", 1)), 1)) for scene, image_path in zip(scenes, image_paths)
+    ]
+    if start_frame > 0 or end_frame is not None:
+        entries = _window_entries(entries, start_frame, end_frame)
+        if not entries:
+            raise RuntimeError(f"No scenes in frame range {start_frame}-{end_frame}.")
+    if backend == "ffmpeg-vfr":
+        require_ffmpeg()
+        entries = [(image_path, duration) for image_path, duration in entries if os.path.isfile(image_path)]
 
-        duration = int(scene.get("duration_frames", 1))
-        for _ in range(max(duration, 1)):
-            out.write(frame)
+    preflight_started = time.perf_counter()
+    sizes = preflight_sizes(
+        list(dict.fromkeys([first_img_path] + [image_path for image_path, _ in entries])), probe=normalize == "error"
+    )
+    source_size = sizes.get(first_img_path) or (width * proxy_factor, height * proxy_factor)
+    mismatched = size_mismatches(sizes, source_size)
+    preflight_seconds = time.perf_counter() - preflight_started
+    if mismatched and normalize == "error":
+        names = ", ".join(os.path.basename(path) for path in mismatched[:5])
+        raise RuntimeError(
+            f"{len(mismatched)} images differ from the output size {source_size[0]}x{source_size[1]}: {names}"
+            + (" ..." if len(mismatched) > 5 else "")
+        )
 
-        scenes_written += 1
-        if progress_callback is not None:
-            progress_callback(scenes_written, len(scenes))
+    image_cache: Optional[DecodedImageCache] = None
+    if decode_cache_mb > 0 and backend in ("opencv", "ffmpeg-pipe"):
+        image_cache = DecodedImageCache(decode_cache_mb * 1024 * 1024, imread_flags)
 
-    out.release()
+    backend_encoder = encoder if backend != "opencv" else None
+    stage_seconds: Dict[str, float] = {"preflight": preflight_seconds}
+    start_time = time.time()
+    chunk_count = 1
+    cache_stats: Dict[str, int] = {}
+    if proxy_factor != 1:
+        scenes_written, frames_written = render_opencv(
+            entries,
+            output_video,
+            fps,
+            (width, height),
+            prefetch_depth,
+            decode_workers,
+            progress_callback,
+            fourcc=PROXY_FOURCC,
+            imread_flags=imread_flags,
+            image_cache=image_cache,
+            stage_seconds=stage_seconds,
+            normalize=normalize,
+        )
+    elif cache_dir:
+        cache_stats = render_cached(
+            entries,
+            output_video,
+            fps,
+            (width, height),
+            cache_dir,
+            backend,
+            chunks,
+            prefetch_depth,
+            decode_workers,
+            progress_callback,
+            image_cache,
+            stage_seconds,
+            normalize,
+            backend_encoder,
+            prune=start_frame == 0 and end_frame is None,
+        )
+        scenes_written, frames_written = len(entries), sum(duration for _, duration in entries)
+    elif chunks > 1 and len(plan_chunks(len(entries), chunks)) > 1:
+        scenes_written, frames_written, chunk_count = render_chunks(
+            entries,
+            output_video,
+            fps,
+            (width, height),
+            chunks,
+            backend,
+            prefetch_depth,
+            decode_workers,
+            progress_callback,
+            stage_seconds,
+            normalize,
+            backend_encoder,
+        )
+    else:
+        scenes_written, frames_written = render_scenes(
+            entries,
+            output_video,
+            fps,
+            (width, height),
+            backend,
+            prefetch_depth,
+            decode_workers,
+            progress_callback,
+            image_cache,
+            stage_seconds,
+            normalize,
+            backend_encoder,
+        )
 
     elapsed_seconds = time.time() - start_time
     return {
@@ -76,15 +242,105 @@ def combine_frames(
         "timing_scenes": len(scenes),
         "input_images": len(processed_files),
         "scenes_written": scenes_written,
+        "frames_written": frames_written,
+        "backend": backend,
+        "encoder": backend_encoder.encoder if backend_encoder is not None else "mp4v",
+        "encoder_fallback": encoder_fallback,
+        "chunks": chunk_count,
+        "proxy_factor": proxy_factor,
+        "start_frame": start_frame,
+        "end_frame": end_frame,
+        "prefetch_depth": prefetch_depth,
+        **cache_stats,
+        **(image_cache.stats() if image_cache is not None else {}),
+        "normalize": normalize,
+        "size_mismatches": len(mismatched),
+        "stage_seconds": stage_seconds,
         "elapsed_seconds": elapsed_seconds,
     }
 
 
+def _window_entries(entries: List[SceneEntry], start_frame: int, end_frame: Optional[int]) -> List[SceneEntry]:
+    """Keep the parts of scenes inside [start_frame, end_frame)."""
+    window: List[SceneEntry] = []
+    scene_start = 0
+    for image_path, duration in entries:
+        scene_end = scene_start + duration
+        if end_frame is not None and scene_start >= end_frame:
+            break
+        clipped = min(scene_end, end_frame if end_frame is not None else scene_end) - max(scene_start, start_frame)
+        if clipped > 0:
+            window.append((image_path, clipped))
+        scene_start = scene_end
+    return window
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Combine processed keyframes into a video.")
     parser.add_argument("--json-path", default="timing.json", help="Path to timing json produced by extraction.")
     parser.add_argument("--processed-folder", default="processed_frames", help="Processed keyframe image directory.")
     parser.add_argument("--output-video", default="final_output.mp4", help="Output video path.")
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=4,
+        help="Images decoded ahead of the encoder. 0 = decode on the encoding thread.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=COMBINE_BACKENDS,
+        default="opencv",
+        help=(
+            "opencv writes every held frame; ffmpeg-pipe streams them to a multithreaded x264/x265 "
+            "(falls back to opencv without ffmpeg); ffmpeg-vfr encodes each scene once (needs ffmpeg)."
+        ),
+    )
+    parser.add_argument("--codec", choices=list(ENCODER_CODECS), default="h264", help="Codec of the ffmpeg backends.")
+    parser.add_argument(
+        "--preset",
+        choices=ENCODER_PRESETS,
+        default="veryfast",
+        help="x264/x265 speed preset; slower presets give smaller files.",
+    )
+    parser.add_argument("--crf", type=int, default=20, help="Constant rate factor, 0-51; lower is higher quality.")
+    parser.add_argument("--threads", type=int, default=0, help="Encoder threads. 0 = all cores.")
+    parser.add_argument(
+        "--chunks",
+        type=int,
+        default=1,
+        help="Render in this many parallel chunks joined without re-encoding (needs ffmpeg). 1 = single pass.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default="",
+        help="Segment cache for incremental re-rendering; only changed segments are encoded (needs ffmpeg).",
+    )
+    parser.add_argument(
+        "--proxy",
+        type=int,
+        choices=[1, *PROXY_IMREAD_FLAGS],
+        default=1,
+        help="Render a reduced-size MJPG proxy for timing review (use an .avi output). 1 = full render.",
+    )
+    parser.add_argument("--start-frame", type=int, default=0, help="First timeline frame to render.")
+    parser.add_argument(
+        "--end-frame",
+        type=int,
+        default=None,
+        help="Timeline frame to stop before. Omit to render to the end.",
+    )
+    parser.add_argument(
+        "--decode-cache-mb",
+        type=int,
+        default=DEFAULT_DECODE_CACHE_MB,
+        help="Memory for reusing decoded images of repeated drawings. 0 = off.",
+    )
+    parser.add_argument(
+        "--normalize",
+        choices=NORMALIZE_MODES,
+        default=DEFAULT_NORMALIZE_MODE,
+        help="How images of another size than the first are fitted; error stops before rendering.",
+    )
     return parser.parse_args()
 
 
@@ -94,6 +350,16 @@ def main() -> None:
         json_path=args.json_path,
         processed_folder=args.processed_folder,
         output_video=args.output_video,
+        prefetch_depth=args.prefetch,
+        backend=args.backend,
+        chunks=args.chunks,
+        cache_dir=args.cache_dir or None,
+        proxy_factor=args.proxy,
+        start_frame=args.start_frame,
+        end_frame=args.end_frame,
+        decode_cache_mb=args.decode_cache_mb,
+        normalize=args.normalize,
+        encoder=EncoderOptions(codec=args.codec, preset=args.preset, crf=args.crf, threads=args.threads),
     )
     print(
         "Done. Wrote "
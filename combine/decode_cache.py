@@ -0,0 +1,67 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+DEFAULT_DECODE_CACHE_MB = 256
+
+
+class DecodedImageCache:
+    """
+    Bounded LRU of decoded images keyed by a hash of the file bytes.
+
+    Identical drawings saved under different names, or listed by several
+    scenes, are decoded once and the same array is returned again. Entries are
+    evicted least recently used first once max_bytes of decoded pixels is
+    exceeded. Safe to share between decode threads.
+    """
+
+    def __init__(self, max_bytes: int, imread_flags: int = cv2.IMREAD_COLOR) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self.imread_flags = imread_flags
+        self.hits = 0
+        self.misses = 0
+        self.bytes_in_use = 0
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path: str) -> Optional[np.ndarray]:
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), self.imread_flags)
+        if image is None or image.nbytes > self.max_bytes:
+            return image
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = image
+                self.bytes_in_use += image.nbytes
+                while self.bytes_in_use > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.bytes_in_use -= evicted.nbytes
+        return image
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "decode_cache_hits": self.hits,
+                "decode_cache_misses": self.misses,
+                "decode_cache_hit_rate": self.hits / lookups if lookups else 0.0,
+                "decode_cache_entries": len(self._entries),
+                "decode_cache_bytes": self.bytes_in_use,
+            }
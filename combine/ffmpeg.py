@@ -0,0 +1,381 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ProgressCallback = Callable[[int, int], None]
+
+FFMPEG_ENV = "FFMPEG_BINARY"
+
+# Codec name -> ffmpeg encoder used for it.
+ENCODER_CODECS = {"h264": "libx264", "hevc": "libx265"}
+# Shared by x264 and x265, fastest first.
+ENCODER_PRESETS = (
+    "ultrafast",
+    "superfast",
+    "veryfast",
+    "faster",
+    "fast",
+    "medium",
+    "slow",
+    "slower",
+    "veryslow",
+)
+MAX_CRF = 51
+# The packaged app has no console; without this each ffmpeg call opens one on Windows.
+CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+
+
+@dataclass(frozen=True)
+class EncoderOptions:
+    codec: str = "h264"
+    preset: str = "veryfast"
+    crf: int = 20
+    # 0 lets the encoder use every core.
+    threads: int = 0
+
+    def validate(self) -> None:
+        if self.codec not in ENCODER_CODECS:
+            raise ValueError(f"Unknown encoder codec: {self.codec}")
+        if self.preset not in ENCODER_PRESETS:
+            raise ValueError(f"Unknown encoder preset: {self.preset}")
+        if not 0 <= self.crf <= MAX_CRF:
+            raise ValueError(f"crf must be between 0 and {MAX_CRF}")
+        if self.threads < 0:
+            raise ValueError("threads must be 0 (automatic) or positive")
+
+    @property
+    def encoder(self) -> str:
+        return ENCODER_CODECS[self.codec]
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Locate ffmpeg: the FFMPEG_BINARY environment variable first, then PATH."""
+    configured = os.environ.get(FFMPEG_ENV, "").strip()
+    if configured:
+        return configured if os.path.isfile(configured) else shutil.which(configured)
+    return shutil.which("ffmpeg")
+
+
+def require_ffmpeg() -> str:
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError(f"ffmpeg not found. Install ffmpeg or set {FFMPEG_ENV} to its path.")
+    return ffmpeg
+
+
+@lru_cache(maxsize=None)
+def available_encoders(ffmpeg: str) -> Tuple[str, ...]:
+    """Names of the video encoders an ffmpeg binary was built with."""
+    try:
+        completed = subprocess.run(
+            [ffmpeg, "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            creationflags=CREATION_FLAGS,
+        )
+    except OSError:
+        return ()
+    names = []
+    for line in completed.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].startswith("V") and len(parts[0]) == 6:
+            names.append(parts[1])
+    return tuple(names)
+
+
+def find_encoder(options: EncoderOptions) -> Optional[str]:
+    """ffmpeg path when it can encode with options.codec, otherwise None."""
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None or options.encoder not in available_encoders(ffmpeg):
+        return None
+    return ffmpeg
+
+
+def frame_rate_fraction(fps: float) -> Fraction:
+    # 29.97 -> 30000/1001, 24.0 -> 24/1
+    return Fraction(fps).limit_denominator(1001)
+
+
+def write_concat_script(path: str, entries: Sequence[Tuple[str, int]], fps: float) -> None:
+    """
+    Describe a VFR stream as an ffconcat script: each image is shown once for
+    its duration in frames.
+
+    Entry start times are rounded from cumulative frame counts, so they land on
+    exact frame boundaries. Every image is read at the output frame rate, which
+    gives the last packet a duration of exactly one frame; the last hold is
+    therefore split so its final frame is a separate packet and the stream ends
+    exactly at the total frame count.
+    """
+    rate = frame_rate_fraction(fps)
+    items = [(image_path, max(int(duration), 1)) for image_path, duration in entries]
+    if items and items[-1][1] > 1:
+        image_path, duration = items[-1]
+        items[-1:] = [(image_path, duration - 1), (image_path, 1)]
+
+    lines = ["ffconcat version 1.0"]
+    elapsed_frames = 0
+    for image_path, duration in items:
+        start_us = _frames_to_microseconds(elapsed_frames, rate)
+        elapsed_frames += duration
+        lines.append(f"file '{_escape_path(image_path)}'")
+        lines.append(f"option framerate {rate.numerator}/{rate.denominator}")
+        lines.append(f"duration {_frames_to_microseconds(elapsed_frames, rate) - start_us}us")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def render_vfr(
+    entries: Sequence[Tuple[str, int]],
+    output_video: str,
+    fps: float,
+    size: Tuple[int, int],
+    progress_callback: Optional[ProgressCallback] = None,
+    ffmpeg: Optional[str] = None,
+    normalize: str = "stretch",
+    encoder: Optional[EncoderOptions] = None,
+) -> int:
+    """
+    Encode (image path, duration frames) entries once each into a VFR mp4,
+    H.264 with the encoder defaults unless encoder options are given.
+
+    size is the (width, height) every image is brought to with the normalize
+    mode (see combine.normalize). Returns the number of frames in the output
+    timeline.
+    """
+    ffmpeg = ffmpeg or require_ffmpeg()
+    rate = frame_rate_fraction(fps)
+    width, height = size
+    total_frames = sum(max(int(duration), 1) for _, duration in entries)
+
+    with tempfile.TemporaryDirectory(prefix="xfy_vfr_") as work_dir:
+        script_path = os.path.join(work_dir, "scenes.ffconcat")
+        write_concat_script(script_path, entries, fps)
+        command: List[str] = [
+            ffmpeg,
+            "-y",
+            "-hide_banner",
+            "-nostats",
+            "-loglevel",
+            "error",
+            "-progress",
+            "pipe:1",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            script_path,
+            "-vf",
+            _size_filter(width - width % 2, height - height % 2, normalize),
+            "-fps_mode",
+            "vfr",
+            *(_encoder_args(encoder, output_video) if encoder is not None else ["-c:v", "libx264"]),
+            # B-frame reordering shortens the duration mp4 reports for the file.
+            "-bf",
+            "0",
+            "-pix_fmt",
+            "yuv420p",
+            "-video_track_timescale",
+            str(rate.numerator),
+            output_video,
+        ]
+        with tempfile.TemporaryFile(dir=work_dir) as stderr:
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                creationflags=CREATION_FLAGS,
+            )
+            assert process.stdout is not None
+            for line in process.stdout:
+                key, _, value = line.strip().partition("=")
+                if key == "frame" and value.isdigit() and progress_callback is not None:
+                    progress_callback(min(int(value), len(entries)), len(entries))
+            returncode = process.wait()
+            if returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode("utf-8", errors="replace").strip()
+                raise RuntimeError(f"ffmpeg failed with exit code {returncode}: {message[-2000:]}")
+    return total_frames
+
+
+class FfmpegPipeWriter:
+    """
+    Drop-in for cv2.VideoWriter that streams raw BGR frames to an ffmpeg
+    encoder process over stdin.
+
+    x264/x265 run their own frame and slice threads, so encoding scales with
+    the cores given by options.threads while the caller only copies bytes into
+    the pipe. Odd frame sizes are cropped by one pixel for 4:2:0 output.
+    """
+
+    def __init__(
+        self,
+        output_video: str,
+        fps: float,
+        size: Tuple[int, int],
+        options: EncoderOptions,
+        ffmpeg: Optional[str] = None,
+    ) -> None:
+        ffmpeg = ffmpeg or require_ffmpeg()
+        rate = frame_rate_fraction(fps)
+        width, height = size
+        self.size = (int(width), int(height))
+        command: List[str] = [
+            ffmpeg,
+            "-y",
+            "-hide_banner",
+            "-nostats",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-video_size",
+            f"{width}x{height}",
+            "-framerate",
+            f"{rate.numerator}/{rate.denominator}",
+            "-i",
+            "pipe:0",
+        ]
+        if width % 2 or height % 2:
+            command += ["-vf", f"crop={width - width % 2}:{height - height % 2}:0:0"]
+        command += [
+            *_encoder_args(options, output_video),
+            "-pix_fmt",
+            "yuv420p",
+            "-video_track_timescale",
+            str(rate.numerator),
+            output_video,
+        ]
+        self._stderr = tempfile.TemporaryFile()
+        self._process: Optional[subprocess.Popen] = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=self._stderr,
+            creationflags=CREATION_FLAGS,
+        )
+
+    def isOpened(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def write(self, frame: np.ndarray) -> None:
+        if frame.shape[1] != self.size[0] or frame.shape[0] != self.size[1]:
+            raise ValueError(f"Frame size {frame.shape[1]}x{frame.shape[0]} differs from writer size {self.size}")
+        assert self._process is not None and self._process.stdin is not None
+        try:
+            self._process.stdin.write(np.ascontiguousarray(frame).data)
+        except OSError:
+            # A dead encoder is a BrokenPipeError on POSIX but OSError(EINVAL) on Windows.
+            raise RuntimeError(self._failure_message(self._process.wait())) from None
+
+    def release(self) -> None:
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        try:
+            if process.stdin is not None:
+                process.stdin.close()
+        except OSError:
+            pass
+        returncode = process.wait()
+        try:
+            if returncode != 0:
+                raise RuntimeError(self._failure_message(returncode))
+        finally:
+            self._stderr.close()
+
+    def _failure_message(self, returncode: int) -> str:
+        self._stderr.seek(0)
+        message = self._stderr.read().decode("utf-8", errors="replace").strip()
+        return f"ffmpeg encoder failed with exit code {returncode}: {message[-2000:]}"
+
+
+def concat_copy(segment_paths: Sequence[str], output_video: str, fps: float, ffmpeg: Optional[str] = None) -> None:
+    """Join video segments with identical stream parameters without re-encoding."""
+    ffmpeg = ffmpeg or require_ffmpeg()
+    with tempfile.TemporaryDirectory(prefix="xfy_concat_") as work_dir:
+        script_path = os.path.join(work_dir, "segments.ffconcat")
+        lines = ["ffconcat version 1.0"]
+        for segment_path in segment_paths:
+            lines.append(f"file '{_escape_path(segment_path)}'")
+        with open(script_path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        command = [
+            ffmpeg,
+            "-y",
+            "-hide_banner",
+            "-nostats",
+            "-loglevel",
+            "error",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            script_path,
+            "-map",
+            "0",
+            "-c",
+            "copy",
+            "-video_track_timescale",
+            str(frame_rate_fraction(fps).numerator),
+            output_video,
+        ]
+        completed = subprocess.run(
+            command, capture_output=True, text=True, encoding="utf-8", errors="replace", creationflags=CREATION_FLAGS
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"ffmpeg concat failed with exit code {completed.returncode}: {completed.stderr[-2000:]}")
+
+
+def _encoder_args(options: EncoderOptions, output_video: str) -> List[str]:
+    args = ["-c:v", options.encoder, "-preset", options.preset, "-crf", str(options.crf)]
+    if options.codec == "hevc":
+        # libx265 ignores -threads; its thread pool size is an x265 parameter.
+        if options.threads:
+            args += ["-x265-params", f"pools={options.threads}:log-level=error"]
+        else:
+            args += ["-x265-params", "log-level=error"]
+        if output_video.lower().endswith((".mp4", ".mov")):
+            # hvc1 is the sample entry QuickTime and most players expect.
+            args += ["-tag:v", "hvc1"]
+    else:
+        args += ["-threads", str(options.threads)]
+    return args
+
+
+def _size_filter(width: int, height: int, normalize: str) -> str:
+    if normalize == "fit":
+        return (
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+        )
+    if normalize == "crop":
+        return f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}"
+    if normalize == "pad":
+        return f"crop='min(iw,{width})':'min(ih,{height})',pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    return f"scale={width}:{height}"
+
+
+def _escape_path(path: str) -> str:
+    return os.path.abspath(path).replace("\\", "/").replace("'", "'\\''")
+
+
+def _frames_to_microseconds(frames: int, rate: Fraction) -> int:
+    return round(Fraction(frames) * 1_000_000 / rate)
@@ -0,0 +1,183 @@
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# How images whose size differs from the output are brought to it:
+# fit     scale to fit inside, letterbox the rest
+# crop    scale to cover, cut the overflow
+# pad     keep the scale, center on the canvas (cutting what does not fit)
+# stretch scale each axis independently
+# error   refuse to render when the preflight scan finds a mismatch
+NORMALIZE_MODES = ("fit", "crop", "pad", "stretch", "error")
+DEFAULT_NORMALIZE_MODE = "fit"
+
+Size = Tuple[int, int]
+
+
+class FrameNormalizer:
+    """
+    Bring decoded frames to a fixed output size.
+
+    The remap tables for each distinct source size are computed once and
+    shared, so the per-frame cost is a single cv2.remap. Safe to call from
+    several decode threads.
+    """
+
+    def __init__(self, size: Size, mode: str = DEFAULT_NORMALIZE_MODE) -> None:
+        if mode not in NORMALIZE_MODES:
+            raise ValueError(f"Unknown normalize mode: {mode}")
+        self.size = (int(size[0]), int(size[1]))
+        self.mode = mode
+        self._maps: Dict[Size, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, frame: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if frame is None:
+            return None
+        source = (frame.shape[1], frame.shape[0])
+        if source == self.size:
+            return frame
+        if self.mode == "error":
+            raise RuntimeError(
+                f"Image size {source[0]}x{source[1]} differs from output size {self.size[0]}x{self.size[1]}."
+            )
+        with self._lock:
+            maps = self._maps.get(source)
+            if maps is None:
+                maps = _build_maps(source, self.size, self.mode)
+                self._maps[source] = maps
+        return cv2.remap(frame, maps[0], maps[1], cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+
+def _build_maps(source: Size, target: Size, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+    source_w, source_h = source
+    target_w, target_h = target
+    if mode == "stretch":
+        scale_x, scale_y = target_w / source_w, target_h / source_h
+    else:
+        if mode == "fit":
+            scale = min(target_w / source_w, target_h / source_h)
+        elif mode == "crop":
+            scale = max(target_w / source_w, target_h / source_h)
+        else:
+            scale = 1.0
+        scale_x = scale_y = scale
+    # Output pixel centers mapped back to source coordinates, centered on both axes.
+    offset_x = (target_w - source_w * scale_x) / 2.0
+    offset_y = (target_h - source_h * scale_y) / 2.0
+    xs = (np.arange(target_w, dtype=np.float32) + 0.5 - offset_x) / scale_x - 0.5
+    ys = (np.arange(target_h, dtype=np.float32) + 0.5 - offset_y) / scale_y - 0.5
+    map_x = np.broadcast_to(xs[np.newaxis, :], (target_h, target_w))
+    map_y = np.broadcast_to(ys[:, np.newaxis], (target_h, target_w))
+    return cv2.convertMaps(np.ascontiguousarray(map_x), np.ascontiguousarray(map_y), cv2.CV_16SC2)
+
+
+def preflight_sizes(image_paths: Sequence[str], probe: bool = True) -> Dict[str, Optional[Size]]:
+    """
+    Read (width, height) of every image from its file header without decoding
+    pixel data. With probe, files without a readable header (e.g. BigTIFF) are
+    decoded with cv2.imread instead; unknown sizes map to None.
+    """
+    sizes: Dict[str, Optional[Size]] = {}
+    for image_path in image_paths:
+        size = read_image_size(image_path)
+        if size is None and probe:
+            image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+            size = (image.shape[1], image.shape[0]) if image is not None else None
+        sizes[image_path] = size
+    return sizes
+
+
+def size_mismatches(sizes: Dict[str, Optional[Size]], target: Size) -> List[str]:
+    return [image_path for image_path, size in sizes.items() if size is not None and size != tuple(target)]
+
+
+def read_image_size(image_path: str) -> Optional[Size]:
+    """(width, height) from a PNG, JPEG, BMP, WebP or TIFF header, or None."""
+    try:
+        with open(image_path, "rb") as file:
+            head = file.read(32)
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                width, height = struct.unpack(">II", head[16:24])
+                return width, height
+            if head.startswith(b"BM") and len(head) >= 26:
+                width, height = struct.unpack("<ii", head[18:26])
+                return width, abs(height)
+            if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+                return _webp_size(head)
+            if head.startswith(b"\xff\xd8"):
+                file.seek(2)
+                return _jpeg_size(file)
+            if head.startswith(b"II*\x00") or head.startswith(b"MM\x00*"):
+                return _tiff_size(file, "<" if head.startswith(b"II") else ">", head)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def _webp_size(head: bytes) -> Optional[Size]:
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25:
+        bits = struct.unpack("<I", head[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(head) >= 30:
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+# TIFF tags ImageWidth and ImageLength; their values are SHORT (3) or LONG (4).
+_TIFF_WIDTH = 256
+_TIFF_HEIGHT = 257
+_TIFF_VALUE_FORMATS = {3: "H", 4: "I"}
+
+
+def _tiff_size(file, order: str, head: bytes) -> Optional[Size]:
+    # Size of the first image, from the entries of the first IFD.
+    file.seek(struct.unpack(order + "I", head[4:8])[0])
+    (count,) = struct.unpack(order + "H", file.read(2))
+    values: Dict[int, int] = {}
+    for _ in range(count):
+        tag, value_type, _, value = struct.unpack(order + "HHI4s", file.read(12))
+        value_format = _TIFF_VALUE_FORMATS.get(value_type)
+        if tag in (_TIFF_WIDTH, _TIFF_HEIGHT) and value_format is not None:
+            values[tag] = struct.unpack_from(order + value_format, value)[0]
+    if _TIFF_WIDTH not in values or _TIFF_HEIGHT not in values:
+        return None
+    return values[_TIFF_WIDTH], values[_TIFF_HEIGHT]
+
+
+# Start-of-frame markers carry the image size; C4 (DHT), C8 (JPG) and CC (DAC) do not.
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(file) -> Optional[Size]:
+    while True:
+        byte = file.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = file.read(1)
+        while marker == b"\xff":
+            marker = file.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0xD8 or code == 0x01 or 0xD0 <= code <= 0xD7:
+            continue
+        if code == 0xD9 or code == 0xDA:
+            return None
+        length = struct.unpack(">H", file.read(2))[0]
+        if code in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">xHH", file.read(5))
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
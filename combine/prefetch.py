@@ -0,0 +1,52 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+ImageLoader = Callable[[str], Optional[np.ndarray]]
+
+
+def default_decode_workers(depth: int) -> int:
+    return max(1, min(depth, (os.cpu_count() or 2) - 1))
+
+
+class ImagePrefetcher:
+    """
+    Decode images in order on a thread pool, at most depth frames ahead.
+
+    Iterating yields one decoded image (or None when loading failed) per path.
+    Decoded frames waiting for the consumer are capped at depth; with depth 0
+    images are decoded on the consumer's thread.
+    """
+
+    def __init__(self, paths: List[str], depth: int, workers: int = 0, load: ImageLoader = cv2.imread) -> None:
+        self._paths = paths
+        self._depth = max(0, depth)
+        self._load = load
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self._depth > 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers or default_decode_workers(self._depth), thread_name_prefix="combine-decode"
+            )
+
+    def __iter__(self) -> Iterator[Optional[np.ndarray]]:
+        if self._executor is None:
+            for path in self._paths:
+                yield self._load(path)
+            return
+
+        pending: Deque[Future] = deque()
+        next_index = 0
+        while pending or next_index < len(self._paths):
+            while next_index < len(self._paths) and len(pending) < self._depth:
+                pending.append(self._executor.submit(self._load, self._paths[next_index]))
+                next_index += 1
+            yield pending.popleft().result()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
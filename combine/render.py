@@ -0,0 +1,149 @@
+import threading
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from combine.decode_cache import DecodedImageCache
+from combine.ffmpeg import EncoderOptions, FfmpegPipeWriter, render_vfr
+from combine.normalize import DEFAULT_NORMALIZE_MODE, FrameNormalizer
+from combine.prefetch import ImagePrefetcher
+
+ProgressCallback = Callable[[int, int], None]
+
+# "opencv" writes every frame of a hold through cv2.VideoWriter; "ffmpeg-pipe"
+# streams the same frames to a multithreaded x264/x265 encoder instead;
+# "ffmpeg-vfr" encodes each scene once with its duration as presentation time.
+COMBINE_BACKENDS = ("opencv", "ffmpeg-pipe", "ffmpeg-vfr")
+
+SceneEntry = Tuple[str, int]
+
+# Proxy reduction factor -> imread flag that decodes at that reduced size.
+PROXY_IMREAD_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+PROXY_FOURCC = "MJPG"
+
+
+def render_scenes(
+    entries: Sequence[SceneEntry],
+    output_video: str,
+    fps: float,
+    size: Tuple[int, int],
+    backend: str = "opencv",
+    prefetch_depth: int = 4,
+    decode_workers: int = 0,
+    progress_callback: Optional[ProgressCallback] = None,
+    image_cache: Optional[DecodedImageCache] = None,
+    stage_seconds: Optional[Dict[str, float]] = None,
+    normalize: str = DEFAULT_NORMALIZE_MODE,
+    encoder: Optional[EncoderOptions] = None,
+) -> Tuple[int, int]:
+    """
+    Render (image path, duration frames) entries with one backend.
+
+    Images of another size are brought to size with the normalize mode (see
+    combine.normalize). encoder sets codec, preset, CRF and threads of the
+    ffmpeg backends. Returns (scenes_written, frames_written).
+    """
+    if backend == "ffmpeg-vfr":
+        started = time.perf_counter()
+        frames_written = render_vfr(
+            entries, output_video, fps, size, progress_callback, normalize=normalize, encoder=encoder
+        )
+        if stage_seconds is not None:
+            # ffmpeg decodes and encodes in one process; it is all counted as encode.
+            stage_seconds["encode"] = stage_seconds.get("encode", 0.0) + time.perf_counter() - started
+        return len(entries), frames_written
+    return render_opencv(
+        entries,
+        output_video,
+        fps,
+        size,
+        prefetch_depth,
+        decode_workers,
+        progress_callback,
+        image_cache=image_cache,
+        stage_seconds=stage_seconds,
+        normalize=normalize,
+        encoder=(encoder or EncoderOptions()) if backend == "ffmpeg-pipe" else None,
+    )
+
+
+def render_opencv(
+    entries: Sequence[SceneEntry],
+    output_video: str,
+    fps: float,
+    size: Tuple[int, int],
+    prefetch_depth: int = 4,
+    decode_workers: int = 0,
+    progress_callback: Optional[ProgressCallback] = None,
+    fourcc: str = "mp4v",
+    imread_flags: int = cv2.IMREAD_COLOR,
+    image_cache: Optional[DecodedImageCache] = None,
+    stage_seconds: Optional[Dict[str, float]] = None,
+    normalize: str = DEFAULT_NORMALIZE_MODE,
+    encoder: Optional[EncoderOptions] = None,
+) -> Tuple[int, int]:
+    """
+    Write every held frame through cv2.VideoWriter, or through an ffmpeg
+    encoder pipe with encoder options; images that fail to load are skipped.
+
+    With image_cache, images are loaded through it (its own imread flags apply)
+    so repeated drawings are decoded once. Frames are normalized to size on
+    the decode threads, right after decoding.
+
+    stage_seconds accumulates "decode" and "resize" (both summed over decode
+    threads), "wait" (encoder blocked on decoding) and "encode".
+    """
+    stage_seconds = stage_seconds if stage_seconds is not None else {}
+    for stage in ("decode", "wait", "resize", "encode"):
+        stage_seconds.setdefault(stage, 0.0)
+    stage_lock = threading.Lock()
+    load = image_cache.load if image_cache is not None else partial(cv2.imread, flags=imread_flags)
+    normalizer = FrameNormalizer(size, normalize)
+
+    def timed_load(path: str) -> Optional[np.ndarray]:
+        started = time.perf_counter()
+        image = load(path)
+        decoded = time.perf_counter()
+        image = normalizer(image)
+        with stage_lock:
+            stage_seconds["decode"] += decoded - started
+            stage_seconds["resize"] += time.perf_counter() - decoded
+        return image
+
+    if encoder is not None:
+        out = FfmpegPipeWriter(output_video, fps, size, encoder)
+    else:
+        out = cv2.VideoWriter(output_video, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    image_paths: List[str] = [image_path for image_path, _ in entries]
+    prefetcher = ImagePrefetcher(image_paths, prefetch_depth, decode_workers, load=timed_load)
+    frames = iter(prefetcher)
+    scenes_written = 0
+    frames_written = 0
+    try:
+        for _, duration in entries:
+            started = time.perf_counter()
+            frame = next(frames)
+            stage_seconds["wait"] += time.perf_counter() - started
+            if frame is None:
+                continue
+
+            started = time.perf_counter()
+            for _ in range(duration):
+                out.write(frame)
+            frames_written += duration
+            stage_seconds["encode"] += time.perf_counter() - started
+
+            scenes_written += 1
+            if progress_callback is not None:
+                progress_callback(scenes_written, len(entries))
+    finally:
+        prefetcher.close()
+        out.release()
+    return scenes_written, frames_written
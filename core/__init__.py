@@ -1,5 +1,17 @@
+from .collector import FrameStoreGcTask
 from .combiner import CombineTask
-from .extractor import ExtractTask
-from .project_manager import ProjectInfo, ProjectManager
+from .extractor import ExtractTask, RethresholdTask
+from .importer import ImageSyncTask, ImportTask
+from .project_manager import ProjectInfo, ProjectManager, ProjectState
 
-__all__ = ["ProjectInfo", "ProjectManager", "ExtractTask", "CombineTask"]
+__all__ = [
+    "ProjectInfo",
+    "ProjectManager",
+    "ProjectState",
+    "ExtractTask",
+    "RethresholdTask",
+    "CombineTask",
+    "ImportTask",
+    "ImageSyncTask",
+    "FrameStoreGcTask",
+]
@@ -0,0 +1,23 @@
+from PySide6.QtCore import QObject, Signal, Slot
+
+from core.project_manager import ProjectManager
+
+
+class FrameStoreGcTask(QObject):
+    """Drop frame store blobs no project links to; scans the whole store, so it runs off the GUI thread."""
+
+    finished = Signal(dict)
+    failed = Signal(str)
+    log = Signal(str)
+
+    def __init__(self, project_manager: ProjectManager) -> None:
+        super().__init__()
+        self.project_manager = project_manager
+
+    @Slot()
+    def run(self) -> None:
+        try:
+            self.log.emit("正在清理帧库...")
+            self.finished.emit(self.project_manager.collect_frame_store())
+        except Exception as exc:
+            self.failed.emit(str(exc))
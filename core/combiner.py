@@ -2,10 +2,13 @@ import os
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 from PySide6.QtCore import QObject, Signal, Slot
 
 from combine.combine import combine_frames
+from combine.ffmpeg import EncoderOptions, find_ffmpeg
+from combine.normalize import DEFAULT_NORMALIZE_MODE
 
 
 class CombineTask(QObject):
@@ -14,29 +17,84 @@ class CombineTask(QObject):
     failed = Signal(str)
     log = Signal(str)
 
-    def __init__(self, timing_json: Path, modified_dir: Path, output_dir: Path, project_name: str) -> None:
+    def __init__(
+        self,
+        timing_json: Path,
+        modified_dir: Path,
+        output_dir: Path,
+        project_name: str,
+        prefetch_depth: int = 4,
+        backend: str = "opencv",
+        chunks: int = 1,
+        cache_dir: Optional[Path] = None,
+        proxy_factor: int = 1,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        normalize: str = DEFAULT_NORMALIZE_MODE,
+        encoder: Optional[EncoderOptions] = None,
+    ) -> None:
         super().__init__()
         self.timing_json = Path(timing_json)
         self.modified_dir = Path(modified_dir)
         self.output_dir = Path(output_dir)
         self.project_name = project_name
+        self.prefetch_depth = int(prefetch_depth)
+        self.backend = backend
+        self.chunks = int(chunks)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.proxy_factor = int(proxy_factor)
+        self.start_frame = int(start_frame)
+        self.end_frame = int(end_frame) if end_frame is not None else None
+        self.normalize = normalize
+        self.encoder = encoder
 
     @Slot()
     def run(self) -> None:
         try:
-            self.output_dir.mkdir(parents=True, exist_ok=True)
-            output_name = f"{self.project_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-            output_video = self.output_dir / output_name
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            windowed = self.start_frame > 0 or self.end_frame is not None
+            if windowed:
+                stamp += f"_f{self.start_frame}-{self.end_frame if self.end_frame is not None else 'end'}"
+            backend, chunks, cache_dir = self.backend, self.chunks, self.cache_dir
+            if self.proxy_factor > 1:
+                # Proxies go to output/proxy so they are never listed as final outputs.
+                output_dir = self.output_dir / "proxy"
+                output_video = output_dir / f"{self.project_name}_{stamp}_proxy.avi"
+                backend, chunks, cache_dir = "opencv", 1, None
+            elif windowed:
+                # Range renders are review cuts, kept out of the final outputs like proxies.
+                output_dir = self.output_dir / "range"
+                output_video = output_dir / f"{self.project_name}_{stamp}.mp4"
+            else:
+                output_dir = self.output_dir
+                output_video = output_dir / f"{self.project_name}_{stamp}.mp4"
+            output_dir.mkdir(parents=True, exist_ok=True)
 
-            self.log.emit("开始合成视频任务...")
+            self.log.emit("开始生成预览代理..." if self.proxy_factor > 1 else "开始合成视频任务...")
             start_time = time.time()
+            if cache_dir is not None and find_ffmpeg() is None:
+                self.log.emit("未找到 ffmpeg，本次完整渲染，不使用渲染缓存。")
+                cache_dir = None
             result = combine_frames(
                 json_path=str(self.timing_json),
                 processed_folder=str(self.modified_dir),
                 output_video=str(output_video),
+                prefetch_depth=self.prefetch_depth,
+                backend=backend,
+                chunks=chunks,
+                cache_dir=str(cache_dir) if cache_dir is not None else None,
+                proxy_factor=self.proxy_factor,
+                start_frame=self.start_frame,
+                end_frame=self.end_frame,
+                normalize=self.normalize,
+                encoder=self.encoder,
                 progress_callback=self._on_progress,
             )
             result["elapsed_seconds"] = time.time() - start_time
+            if result.get("encoder_fallback"):
+                self.log.emit("未找到可用的 ffmpeg 编码器，已改用 OpenCV 编码。")
+            if result.get("size_mismatches"):
+                self.log.emit(f"有 {result['size_mismatches']} 张图片尺寸与首张不一致，已自动适配到输出尺寸。")
             if output_video.exists():
                 result["output_size"] = os.path.getsize(output_video)
             else:
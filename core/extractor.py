@@ -1,9 +1,20 @@
 import time
 from pathlib import Path
+from typing import Optional
 
 from PySide6.QtCore import QObject, Signal, Slot
 
-from extract.extract import extract_keyframes
+from core.project_manager import IMAGE_EXTENSIONS
+
+from extract.checkpoint import checkpoint_path_for, clear_checkpoint, load_checkpoint
+from extract.extract import default_writer_workers, extract_keyframes
+from extract.formats import DEFAULT_FRAME_FORMAT
+from extract.frame_store import remove_frame
+from extract.scores import apply_threshold, scores_path_for
+
+
+def timing_path_for(video_path: Path, timestamps_dir: Path) -> Path:
+    return Path(timestamps_dir) / f"{Path(video_path).stem}.json"
 
 
 class ExtractTask(QObject):
@@ -12,22 +23,56 @@ class ExtractTask(QObject):
     failed = Signal(str)
     log = Signal(str)
 
-    def __init__(self, video_path: Path, frames_dir: Path, timestamps_dir: Path, threshold: int) -> None:
+    def __init__(
+        self,
+        video_path: Path,
+        frames_dir: Path,
+        timestamps_dir: Path,
+        threshold: int,
+        writer_workers: Optional[int] = None,
+        analysis_scale: float = 1.0,
+        processes: int = 0,
+        resume: bool = True,
+        frame_format: str = DEFAULT_FRAME_FORMAT,
+        sample_step: int = 1,
+        frame_store: Optional[Path] = None,
+        record_scores: bool = True,
+    ) -> None:
         super().__init__()
         self.video_path = Path(video_path)
         self.frames_dir = Path(frames_dir)
         self.timestamps_dir = Path(timestamps_dir)
         self.threshold = int(threshold)
+        self.writer_workers = default_writer_workers() if writer_workers is None else int(writer_workers)
+        self.analysis_scale = float(analysis_scale)
+        self.processes = int(processes)
+        self.resume = bool(resume)
+        self.frame_format = frame_format
+        self.sample_step = int(sample_step)
+        self.frame_store = Path(frame_store) if frame_store else None
+        # Scores allow instant re-thresholding; without them each comparison stops at the threshold.
+        self.record_scores = bool(record_scores) and self.sample_step <= 1
 
     @Slot()
     def run(self) -> None:
         try:
             self.frames_dir.mkdir(parents=True, exist_ok=True)
             self.timestamps_dir.mkdir(parents=True, exist_ok=True)
-            self._clear_existing_frames()
-
-            timing_name = f"{self.video_path.stem}.json"
-            timing_path = self.timestamps_dir / timing_name
+            timing_path = timing_path_for(self.video_path, self.timestamps_dir)
+            sampled = self.sample_step > 1
+            scores_path = scores_path_for(str(timing_path))
+            checkpoint_path = checkpoint_path_for(str(timing_path))
+            resumable = self.processes <= 1 and not sampled
+            if resumable and self.resume and self._can_resume(checkpoint_path):
+                self.log.emit("检测到未完成的拆帧进度，继续处理...")
+            else:
+                clear_checkpoint(checkpoint_path)
+                self._clear_existing_frames()
+                # The sidecar describes the cleared keyframes; a finished run writes a new one.
+                Path(scores_path).unlink(missing_ok=True)
+            if not self.record_scores:
+                # No scores for this result (sampling skips frames); drop the previous sidecar.
+                Path(scores_path).unlink(missing_ok=True)
 
             self.log.emit("开始拆帧任务...")
             start_time = time.time()
@@ -36,6 +81,14 @@ class ExtractTask(QObject):
                 output_folder=str(self.frames_dir),
                 timing_json_path=str(timing_path),
                 threshold=self.threshold,
+                writer_workers=self.writer_workers,
+                analysis_scale=self.analysis_scale,
+                processes=self.processes,
+                scores_path=scores_path if self.record_scores else None,
+                checkpoint_path=checkpoint_path if resumable else None,
+                frame_format=self.frame_format,
+                sample_step=self.sample_step,
+                frame_store=str(self.frame_store) if self.frame_store is not None else None,
                 progress_callback=self._on_progress,
             )
             result["timing_json"] = str(timing_path)
@@ -47,7 +100,62 @@ class ExtractTask(QObject):
     def _on_progress(self, current: int, total: int) -> None:
         self.progress.emit(int(current), int(total))
 
+    def _can_resume(self, checkpoint_path: str) -> bool:
+        state = load_checkpoint(
+            checkpoint_path,
+            str(self.video_path),
+            self.threshold,
+            self.analysis_scale,
+            self.record_scores,
+            self.frame_format,
+        )
+        return state is not None
+
     def _clear_existing_frames(self) -> None:
         for path in self.frames_dir.iterdir():
-            if path.is_file() and path.suffix.lower() in {".png", ".jpg", ".jpeg", ".bmp", ".webp"}:
-                path.unlink()
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                remove_frame(str(path))
+
+
+class RethresholdTask(QObject):
+    progress = Signal(int, int)
+    finished = Signal(dict)
+    failed = Signal(str)
+    log = Signal(str)
+
+    def __init__(
+        self,
+        video_path: Path,
+        frames_dir: Path,
+        timestamps_dir: Path,
+        threshold: int,
+        frame_store: Optional[Path] = None,
+    ) -> None:
+        super().__init__()
+        self.video_path = Path(video_path)
+        self.frames_dir = Path(frames_dir)
+        self.timestamps_dir = Path(timestamps_dir)
+        self.threshold = int(threshold)
+        self.frame_store = Path(frame_store) if frame_store else None
+
+    @Slot()
+    def run(self) -> None:
+        try:
+            timing_path = timing_path_for(self.video_path, self.timestamps_dir)
+            self.log.emit("按新阈值更新关键帧...")
+            result = apply_threshold(
+                video_path=str(self.video_path),
+                frames_dir=str(self.frames_dir),
+                timing_json_path=str(timing_path),
+                threshold=self.threshold,
+                progress_callback=self._on_progress,
+                frame_store=str(self.frame_store) if self.frame_store is not None else None,
+            )
+            if result.get("extracted_again"):
+                self.log.emit("记录的分数无法判定多数帧，已按新阈值重新拆帧。")
+            self.finished.emit(result)
+        except Exception as exc:
+            self.failed.emit(str(exc))
+
+    def _on_progress(self, current: int, total: int) -> None:
+        self.progress.emit(int(current), int(total))
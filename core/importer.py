@@ -0,0 +1,95 @@
+from pathlib import Path
+from typing import List
+
+from PySide6.QtCore import QObject, Signal, Slot
+
+from core.project_manager import ProjectInfo, ProjectManager
+from core.video_import import DEFAULT_IMPORT_MODE
+
+IMPORT_MODE_LABELS = {
+    "reflink": "写时复制克隆",
+    "hardlink": "硬链接",
+    "reference": "引用原文件",
+    "copy": "完整复制",
+}
+
+
+class ImportTask(QObject):
+    # Copied / total MiB; only a full copy reports progress.
+    progress = Signal(int, int)
+    finished = Signal(dict)
+    failed = Signal(str)
+    log = Signal(str)
+
+    def __init__(
+        self,
+        project_manager: ProjectManager,
+        project: ProjectInfo,
+        video_path: Path,
+        import_mode: str = DEFAULT_IMPORT_MODE,
+    ) -> None:
+        super().__init__()
+        self.project_manager = project_manager
+        self.project = project
+        self.video_path = Path(video_path)
+        self.import_mode = import_mode
+
+    @Slot()
+    def run(self) -> None:
+        try:
+            self.log.emit("正在导入视频...")
+            strategy = self.project_manager.import_video(
+                self.project,
+                str(self.video_path),
+                self.import_mode,
+                progress_callback=self._on_progress,
+            )
+            self.finished.emit(
+                {
+                    "project_dir": str(self.project.root_dir),
+                    "import_mode": strategy,
+                    "import_label": IMPORT_MODE_LABELS.get(strategy, strategy),
+                }
+            )
+        except Exception as exc:
+            self.failed.emit(str(exc))
+
+    def _on_progress(self, copied: int, total: int) -> None:
+        self.progress.emit(copied >> 20, max(total >> 20, 1))
+
+
+class ImageSyncTask(QObject):
+    progress = Signal(int, int)
+    finished = Signal(dict)
+    failed = Signal(str)
+    log = Signal(str)
+
+    def __init__(
+        self,
+        project_manager: ProjectManager,
+        project: ProjectInfo,
+        source_paths: List[str],
+        verify_hash: bool = False,
+    ) -> None:
+        super().__init__()
+        self.project_manager = project_manager
+        self.project = project
+        self.source_paths = list(source_paths)
+        self.verify_hash = bool(verify_hash)
+
+    @Slot()
+    def run(self) -> None:
+        try:
+            self.log.emit("正在同步修改图片...")
+            result = self.project_manager.sync_modified_images(
+                self.project,
+                self.source_paths,
+                verify_hash=self.verify_hash,
+                progress_callback=self._on_progress,
+            )
+            self.finished.emit({**result, "project_dir": str(self.project.root_dir)})
+        except Exception as exc:
+            self.failed.emit(str(exc))
+
+    def _on_progress(self, current: int, total: int) -> None:
+        self.progress.emit(int(current), int(total))
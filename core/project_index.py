@@ -0,0 +1,92 @@
+import sqlite3
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+INDEX_NAME = "project_index.sqlite3"
+INDEX_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    video_path TEXT,
+    frame_count INTEGER NOT NULL DEFAULT 0,
+    modified_count INTEGER NOT NULL DEFAULT 0,
+    mtime_ns INTEGER NOT NULL,
+    video_size INTEGER,
+    video_mtime_ns INTEGER
+)
+"""
+
+
+@dataclass
+class ProjectRecord:
+    name: str
+    created_at: str
+    video_path: Optional[str]
+    frame_count: int
+    modified_count: int
+    # Modification time of the project root when the record was written.
+    mtime_ns: int
+    # Size and modification time of a referenced source video (see core.video_import),
+    # None when the video lives inside the project.
+    video_size: Optional[int] = None
+    video_mtime_ns: Optional[int] = None
+
+
+class ProjectIndex:
+    """
+    SQLite table of the projects in a workspace, keyed by directory name.
+
+    Records are written when projects are created, extracted or combined and
+    trusted while the project root keeps the recorded modification time, so
+    listing projects needs one stat per project (and per referenced source
+    video) instead of reading every project.json and scanning original/. A missing or unreadable index file is
+    rebuilt from scratch.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        try:
+            self._connection = self._open()
+        except sqlite3.DatabaseError:
+            self.db_path.unlink(missing_ok=True)
+            self._connection = self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(str(self.db_path))
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != INDEX_VERSION:
+                connection.execute("DROP TABLE IF EXISTS projects")
+            connection.execute(_SCHEMA)
+            connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            connection.commit()
+        except sqlite3.DatabaseError:
+            connection.close()
+            raise
+        return connection
+
+    def records(self) -> Dict[str, ProjectRecord]:
+        rows = self._connection.execute(
+            "SELECT name, created_at, video_path, frame_count, modified_count, mtime_ns, video_size, video_mtime_ns "
+            "FROM projects"
+        )
+        return {row[0]: ProjectRecord(*row) for row in rows}
+
+    def upsert(self, record: ProjectRecord) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO projects "
+                "(name, created_at, video_path, frame_count, modified_count, mtime_ns, video_size, video_mtime_ns) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                astuple(record),
+            )
+
+    def remove(self, name: str) -> None:
+        with self._connection:
+            self._connection.execute("DELETE FROM projects WHERE name = ?", (name,))
+
+    def close(self) -> None:
+        self._connection.close()
@@ -1,12 +1,25 @@
+import hashlib
 import json
 import os
 import shutil
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".webp"}
+from extract.frame_store import FRAME_STORE_DIR, collect_garbage, remove_frame, remove_read_only
+
+from .project_index import INDEX_NAME, ProjectIndex, ProjectRecord
+from .video_import import (
+    DEFAULT_IMPORT_MODE,
+    ProgressCallback,
+    import_strategies,
+    resolve_reference,
+    source_fingerprint,
+    transfer_video,
+)
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff"}
 VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv"}
 
 
@@ -26,17 +39,71 @@ class ProjectInfo:
     def display_name(self) -> str:
         return self.name
 
+    @property
+    def render_cache_dir(self) -> Path:
+        return self.root_dir / "render_cache"
+
+
+@dataclass
+class ProjectState:
+    has_video: bool = False
+    frame_images: List[Path] = field(default_factory=list)
+    modified_images: List[Path] = field(default_factory=list)
+    # Newest first.
+    timing_files: List[Path] = field(default_factory=list)
+    output_files: List[Path] = field(default_factory=list)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frame_images)
+
+    @property
+    def modified_count(self) -> int:
+        return len(self.modified_images)
+
+    @property
+    def selected_timing(self) -> Optional[Path]:
+        return self.timing_files[0] if self.timing_files else None
+
+    @property
+    def latest_output(self) -> Optional[Path]:
+        return self.output_files[0] if self.output_files else None
+
+
+# Modification times (ns) of the directories a ProjectState is built from.
+StateSignature = Tuple[int, ...]
+
 
 class ProjectManager:
     def __init__(self, workspace_root: Path) -> None:
         self.workspace_root = Path(workspace_root)
         self.projects_root = self.workspace_root / "projects"
         self.projects_root.mkdir(parents=True, exist_ok=True)
+        self._states: Dict[Path, Tuple[StateSignature, ProjectState]] = {}
+        self.index = ProjectIndex(self.workspace_root / INDEX_NAME)
+
+    @property
+    def frame_store_dir(self) -> Path:
+        """Content-addressed keyframe store shared by every project (see extract.frame_store)."""
+        return self.workspace_root / FRAME_STORE_DIR
 
-    def create_project_from_video(self, video_path: str) -> ProjectInfo:
+    def create_project_from_video(
+        self,
+        video_path: str,
+        import_mode: str = DEFAULT_IMPORT_MODE,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> ProjectInfo:
+        project = self.new_project(video_path, import_mode)
+        self.import_video(project, video_path, import_mode, progress_callback)
+        self.update_index(project)
+        return project
+
+    def new_project(self, video_path: str, import_mode: str = DEFAULT_IMPORT_MODE) -> ProjectInfo:
+        """Create the directories of a project for video_path, without its video yet."""
         source_video = Path(video_path)
         if not source_video.exists():
             raise FileNotFoundError(f"Video file does not exist: {video_path}")
+        import_strategies(import_mode)
 
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         safe_stem = self._safe_name(source_video.stem)
@@ -45,71 +112,148 @@ class ProjectManager:
 
         project = self._build_project(project_root, created_at=stamp)
         self._ensure_structure(project)
-
-        target_video = project.original_dir / source_video.name
-        shutil.copy2(source_video, target_video)
-        project.original_video = target_video
-
-        self._write_metadata(project, source_video.name)
         return project
 
+    def import_video(
+        self,
+        project: ProjectInfo,
+        video_path: str,
+        import_mode: str = DEFAULT_IMPORT_MODE,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> str:
+        """
+        Bring the source video into a new project (see core.video_import) and
+        write project.json. Only touches files, so it may run in a worker
+        thread; call update_index afterwards. Returns the strategy used.
+        """
+        source_video = Path(video_path)
+        target_video, strategy = transfer_video(source_video, project.original_dir, import_mode, progress_callback)
+        reference = source_fingerprint(source_video) if target_video is None else None
+        project.original_video = target_video if target_video is not None else Path(str(reference["path"]))
+        self._write_metadata(project, source_video.name, strategy, reference)
+        return strategy
+
     def list_projects(self) -> List[ProjectInfo]:
-        projects: List[ProjectInfo] = []
+        """
+        Projects newest first. Directories whose modification time matches
+        the index are listed from it; new or changed ones are loaded and
+        re-indexed, and index records of removed directories are dropped.
+        """
         if not self.projects_root.exists():
-            return projects
+            return []
 
-        for project_dir in self.projects_root.iterdir():
-            if not project_dir.is_dir():
+        records = self.index.records()
+        listed: List[Tuple[int, ProjectInfo]] = []
+        for entry in os.scandir(self.projects_root):
+            if not entry.is_dir():
                 continue
+            record = records.pop(entry.name, None)
             try:
-                projects.append(self.load_project(project_dir))
+                if record is not None and record.mtime_ns == entry.stat().st_mtime_ns:
+                    project = self._project_from_record(record)
+                else:
+                    project = self.load_project(Path(entry.path))
+                    record = self.update_index(project)
             except Exception:
                 continue
+            listed.append((record.mtime_ns, project))
+        for name in records:
+            self.index.remove(name)
+
+        listed.sort(key=lambda item: item[0], reverse=True)
+        return [project for _, project in listed]
+
+    def update_index(self, project: ProjectInfo) -> ProjectRecord:
+        """Write the index record of project after it was created, extracted or combined."""
+        state = self.get_project_state(project)
+        video = project.original_video
+        reference = None
+        if video is not None and project.original_dir.resolve() not in video.resolve().parents and video.exists():
+            reference = source_fingerprint(video)
+        record = ProjectRecord(
+            name=project.name,
+            created_at=project.created_at,
+            video_path=str(video) if video is not None else None,
+            frame_count=state.frame_count,
+            modified_count=state.modified_count,
+            mtime_ns=project.root_dir.stat().st_mtime_ns,
+            video_size=int(reference["size"]) if reference else None,
+            video_mtime_ns=int(reference["mtime_ns"]) if reference else None,
+        )
+        self.index.upsert(record)
+        return record
 
-        projects.sort(key=lambda item: item.root_dir.stat().st_mtime, reverse=True)
-        return projects
+    def indexed_counts(self) -> Dict[str, Tuple[int, int]]:
+        """Project name -> (frame count, modified image count) as last indexed."""
+        return {name: (record.frame_count, record.modified_count) for name, record in self.index.records().items()}
 
     def delete_project(self, project_dir: Path) -> None:
+        """Delete a project; its frame store blobs are dropped by collect_frame_store."""
         target = Path(project_dir).resolve()
         root = self.projects_root.resolve()
         if root not in target.parents:
             raise ValueError("Project path is outside projects directory.")
         if target.exists() and target.is_dir():
-            shutil.rmtree(target)
+            shutil.rmtree(target, onerror=remove_read_only)
+        self._invalidate_path(target)
+        self.index.remove(target.name)
+
+    def collect_frame_store(self) -> Dict[str, int]:
+        """Drop frame store blobs no project links to any more (see extract.frame_store)."""
+        return collect_garbage(str(self.frame_store_dir))
 
     def load_project(self, project_dir: Path) -> ProjectInfo:
         project_dir = Path(project_dir)
         metadata_path = project_dir / "project.json"
         created_at = ""
+        metadata: Dict[str, object] = {}
         if metadata_path.exists():
             with open(metadata_path, "r", encoding="utf-8") as file:
                 metadata = json.load(file)
-            created_at = metadata.get("created_at", "")
+            created_at = str(metadata.get("created_at", ""))
         if not created_at:
             created_at = datetime.fromtimestamp(project_dir.stat().st_mtime).strftime("%Y%m%d_%H%M%S")
 
         project = self._build_project(project_dir, created_at=created_at)
         self._ensure_structure(project)
         project.original_video = self._find_first_video(project.original_dir)
+        reference = metadata.get("source_video")
+        if project.original_video is None and isinstance(reference, dict):
+            # Reference imports keep the video in place; a moved or changed source counts as missing.
+            project.original_video = resolve_reference(reference)
         return project
 
-    def get_project_state(self, project: ProjectInfo) -> Dict[str, object]:
-        timing_files = self.list_timing_files(project)
-        output_files = self.list_output_files(project)
-        modified_images = self.list_images(project.modified_dir)
-        frame_images = self.list_images(project.frames_dir)
-
-        state = {
-            "has_video": project.original_video is not None and project.original_video.exists(),
-            "frame_count": len(frame_images),
-            "modified_count": len(modified_images),
-            "timing_files": timing_files,
-            "selected_timing": timing_files[0] if timing_files else None,
-            "output_files": output_files,
-            "latest_output": output_files[0] if output_files else None,
-        }
+    def get_project_state(self, project: ProjectInfo, refresh: bool = False) -> ProjectState:
+        """
+        Snapshot of a project's images, timing files and outputs.
+
+        The snapshot is scanned once and shared until one of the project
+        directories changes its modification time, or until
+        invalidate_project_state is called (needed for changes made within the
+        mtime resolution of the filesystem, which is coarse on network drives).
+        """
+        signature = self._state_signature(project)
+        cached = self._states.get(project.root_dir)
+        if not refresh and cached is not None and cached[0] == signature:
+            return cached[1]
+
+        state = ProjectState(
+            has_video=project.original_video is not None and project.original_video.exists(),
+            frame_images=self.list_images(project.frames_dir),
+            modified_images=self.list_images(project.modified_dir),
+            timing_files=self.list_timing_files(project),
+            output_files=self.list_output_files(project),
+        )
+        self._states[project.root_dir] = (signature, state)
         return state
 
+    def invalidate_project_state(self, project: Optional[ProjectInfo] = None) -> None:
+        """Drop the cached state of project, or of every project."""
+        if project is None:
+            self._states.clear()
+        else:
+            self._states.pop(project.root_dir, None)
+
     def list_timing_files(self, project: ProjectInfo) -> List[Path]:
         if not project.timestamps_dir.exists():
             return []
@@ -135,19 +279,58 @@ class ProjectManager:
         }
 
     def replace_modified_images(self, project: ProjectInfo, source_paths: List[str]) -> int:
-        self.clear_images(project.modified_dir)
-        copied = 0
+        result = self.sync_modified_images(project, source_paths)
+        self.invalidate_project_state(project)
+        return result["total"]
+
+    def sync_modified_images(
+        self,
+        project: ProjectInfo,
+        source_paths: List[str],
+        verify_hash: bool = False,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> Dict[str, int]:
+        """
+        Make modified/ hold exactly the source images, transferring only what changed.
+
+        An image whose size and modification time match the existing file (or
+        that already is the same file) is left alone. With verify_hash, a size
+        match with another mtime is settled by comparing contents. New or
+        changed images are hardlinked where the filesystem allows and copied
+        otherwise; images no longer among the sources are removed. When
+        several sources share a file name, the last one in sorted order wins.
+
+        Only touches files, so it may run in a worker thread; invalidate the
+        project state afterwards. Progress counts source images.
+        """
+        sources: Dict[str, Path] = {}
         for image_path in self._resolve_image_sources(source_paths):
-            target = project.modified_dir / image_path.name
-            shutil.copy2(image_path, target)
-            copied += 1
-        return copied
+            sources[image_path.name] = image_path
+        project.modified_dir.mkdir(parents=True, exist_ok=True)
+        existing = {path.name: path for path in self.list_images(project.modified_dir)}
+
+        result = {"total": len(sources), "unchanged": 0, "linked": 0, "copied": 0, "removed": 0}
+        for name, path in existing.items():
+            if name not in sources:
+                remove_frame(str(path))
+                result["removed"] += 1
+
+        for done, (name, source) in enumerate(sources.items(), start=1):
+            target = project.modified_dir / name
+            if name in existing and self._same_image(source, target, verify_hash):
+                result["unchanged"] += 1
+            else:
+                result["linked" if self._link_or_copy(source, target) else "copied"] += 1
+            if progress_callback is not None:
+                progress_callback(done, len(sources))
+        return result
 
     def clear_images(self, directory: Path) -> None:
         directory.mkdir(parents=True, exist_ok=True)
         for item in directory.iterdir():
             if item.is_file() and item.suffix.lower() in IMAGE_EXTENSIONS:
-                item.unlink()
+                remove_frame(str(item))
+        self._invalidate_path(directory)
 
     def list_images(self, directory: Path) -> List[Path]:
         if not directory.exists():
@@ -156,6 +339,76 @@ class ProjectManager:
             [path for path in directory.iterdir() if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS]
         )
 
+    def _same_image(self, source: Path, target: Path, verify_hash: bool) -> bool:
+        try:
+            source_stat = source.stat()
+            target_stat = target.stat()
+        except OSError:
+            return False
+        if (source_stat.st_dev, source_stat.st_ino) == (target_stat.st_dev, target_stat.st_ino):
+            return True
+        if source_stat.st_size != target_stat.st_size:
+            return False
+        if source_stat.st_mtime_ns == target_stat.st_mtime_ns:
+            return True
+        return verify_hash and self._file_digest(source) == self._file_digest(target)
+
+    def _file_digest(self, path: Path) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.digest()
+
+    def _link_or_copy(self, source: Path, target: Path) -> bool:
+        """Replace target with a hardlink to source, or a copy. True when linked."""
+        partial = target.with_name(target.name + ".partial")
+        partial.unlink(missing_ok=True)
+        try:
+            os.link(source, partial)
+            linked = True
+        except OSError:
+            shutil.copy2(source, partial)
+            linked = False
+        # Windows cannot replace a read-only target, e.g. a link to a frame store blob.
+        if target.exists():
+            remove_frame(str(target))
+        os.replace(partial, target)
+        return linked
+
+    def _state_signature(self, project: ProjectInfo) -> StateSignature:
+        signature = []
+        for directory in (
+            project.original_dir,
+            project.frames_dir,
+            project.modified_dir,
+            project.timestamps_dir,
+            project.output_dir,
+        ):
+            try:
+                signature.append(directory.stat().st_mtime_ns)
+            except OSError:
+                signature.append(-1)
+        return tuple(signature)
+
+    def _invalidate_path(self, path: Path) -> None:
+        path = Path(path).resolve()
+        for root_dir in list(self._states):
+            resolved = root_dir.resolve()
+            if resolved == path or resolved in path.parents:
+                del self._states[root_dir]
+
+    def _project_from_record(self, record: ProjectRecord) -> ProjectInfo:
+        project = self._build_project(self.projects_root / record.name, created_at=record.created_at)
+        if record.video_path and record.video_size is not None:
+            # Referenced sources live outside the project, so the root mtime says nothing about them.
+            project.original_video = resolve_reference(
+                {"path": record.video_path, "size": record.video_size, "mtime_ns": record.video_mtime_ns}
+            )
+        else:
+            project.original_video = Path(record.video_path) if record.video_path else None
+        return project
+
     def _build_project(self, project_root: Path, created_at: str) -> ProjectInfo:
         return ProjectInfo(
             name=project_root.name,
@@ -176,12 +429,21 @@ class ProjectManager:
         project.modified_dir.mkdir(parents=True, exist_ok=True)
         project.output_dir.mkdir(parents=True, exist_ok=True)
 
-    def _write_metadata(self, project: ProjectInfo, source_name: str) -> None:
-        metadata = {
+    def _write_metadata(
+        self,
+        project: ProjectInfo,
+        source_name: str,
+        import_mode: str = "copy",
+        reference: Optional[Dict[str, object]] = None,
+    ) -> None:
+        metadata: Dict[str, object] = {
             "name": project.name,
             "created_at": project.created_at,
             "source_video_name": source_name,
+            "import_mode": import_mode,
         }
+        if reference is not None:
+            metadata["source_video"] = reference
         metadata_path = project.root_dir / "project.json"
         with open(metadata_path, "w", encoding="utf-8") as file:
             json.dump(metadata, file, indent=2, ensure_ascii=False)
@@ -209,3 +471,4 @@ class ProjectManager:
         cleaned = "".join(ch if (ch.isalnum() or ch in {"_", "-"}) else "_" for ch in raw_name)
         cleaned = cleaned.strip("_")
         return cleaned or "project"
+
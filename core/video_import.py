@@ -0,0 +1,118 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ProgressCallback = Callable[[int, int], None]
+
+# "auto" tries a copy-on-write clone, then a hardlink; a full copy is the last
+# resort, so the project never depends on the source staying in place. The
+# other modes force one strategy (reflink and hardlink still fall back to a
+# copy); "reference" keeps the video where it is and must be asked for.
+IMPORT_MODES = ("auto", "reflink", "hardlink", "reference", "copy")
+DEFAULT_IMPORT_MODE = "auto"
+
+# Linux FICLONE ioctl: share the source's extents on btrfs, XFS and similar.
+_FICLONE = 0x40049409
+_COPY_BLOCK = 8 * 1024 * 1024
+
+
+def import_strategies(import_mode: str) -> List[str]:
+    if import_mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {import_mode}")
+    if import_mode == "auto":
+        return ["reflink", "hardlink", "copy"]
+    if import_mode in ("reflink", "hardlink"):
+        return [import_mode, "copy"]
+    return [import_mode]
+
+
+def transfer_video(
+    source: Path,
+    target_dir: Path,
+    import_mode: str = DEFAULT_IMPORT_MODE,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> Tuple[Optional[Path], str]:
+    """
+    Bring source into target_dir with the first strategy of import_mode that
+    works. Returns (path inside target_dir, strategy); the path is None for
+    "reference", where the project points at source instead.
+
+    Only a full copy reports progress, as (bytes copied, total bytes).
+    """
+    source = Path(source).resolve()
+    target = Path(target_dir) / source.name
+    for strategy in import_strategies(import_mode):
+        if strategy == "reflink" and _reflink(source, target):
+            return target, strategy
+        if strategy == "hardlink" and _hardlink(source, target):
+            return target, strategy
+        if strategy == "reference":
+            return None, strategy
+        if strategy == "copy":
+            _copy_with_progress(source, target, progress_callback)
+            return target, strategy
+    raise RuntimeError(f"Unable to import video: {source}")
+
+
+def source_fingerprint(source: Path) -> Dict[str, object]:
+    stat = Path(source).stat()
+    return {"path": str(Path(source).resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def resolve_reference(reference: Dict[str, object]) -> Optional[Path]:
+    """The referenced video when it still exists with the recorded size and mtime."""
+    path = Path(str(reference.get("path", "")))
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if stat.st_size != reference.get("size") or stat.st_mtime_ns != reference.get("mtime_ns"):
+        return None
+    return path
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    except OSError:
+        target.unlink(missing_ok=True)
+        return False
+    shutil.copystat(source, target)
+    return True
+
+
+def _hardlink(source: Path, target: Path) -> bool:
+    try:
+        os.link(source, target)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_with_progress(source: Path, target: Path, progress_callback: Optional[ProgressCallback]) -> None:
+    # Copy under a non-video name so an interrupted import is never taken for the video.
+    partial = target.with_name(target.name + ".partial")
+    total = source.stat().st_size
+    copied = 0
+    try:
+        with open(source, "rb") as src, open(partial, "wb") as dst:
+            while True:
+                block = src.read(_COPY_BLOCK)
+                if not block:
+                    break
+                dst.write(block)
+                copied += len(block)
+                if progress_callback is not None:
+                    progress_callback(copied, total)
+        shutil.copystat(source, partial)
+        os.replace(partial, target)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,60 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+SCORE_BAND_ROWS = 64
+
+
+def analysis_geometry(
+    frame_shape: Tuple[int, ...], scale: float, threshold: int
+) -> Tuple[Optional[Tuple[int, int]], float]:
+    height, width = frame_shape[:2]
+    if scale >= 1.0:
+        return None, float(threshold)
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return size, threshold * (size[0] * size[1]) / float(width * height)
+
+
+def analysis_gray(
+    frame: np.ndarray,
+    size: Optional[Tuple[int, int]],
+    out: Optional[np.ndarray] = None,
+    scratch: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Grayscale analysis image of frame, resized to size when given.
+
+    out (analysis size) and scratch (full-size gray, only used when resizing)
+    are optional destination buffers; results are written into them when they
+    have the right shape.
+    """
+    if size is None:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=out)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=scratch)
+    return cv2.resize(gray, size, dst=out, interpolation=cv2.INTER_AREA)
+
+
+def difference_score(reference: np.ndarray, gray: np.ndarray) -> int:
+    # Same value as np.sum(cv2.absdiff(...)) without the temporary diff image.
+    return int(cv2.norm(reference, gray, cv2.NORM_L1))
+
+
+def banded_difference_score(
+    reference: np.ndarray, gray: np.ndarray, limit: float, band_rows: int = SCORE_BAND_ROWS
+) -> Tuple[int, int]:
+    """
+    Accumulate the difference band by band, stopping once the total reaches limit.
+
+    Returns (score, rows_scanned). The partial sums only grow, so
+    score >= limit gives the same decision as difference_score; the score is
+    exact only when every row was scanned.
+    """
+    height = gray.shape[0]
+    total = 0
+    for top in range(0, height, band_rows):
+        bottom = min(top + band_rows, height)
+        total += int(cv2.norm(reference[top:bottom], gray[top:bottom], cv2.NORM_L1))
+        if total >= limit:
+            return total, bottom
+    return total, height
@@ -0,0 +1,130 @@
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from extract.formats import DEFAULT_FRAME_FORMAT
+from extract.frame_store import remove_frame
+from extract.scores import ScoreRecorder
+
+CHECKPOINT_SUFFIX = ".checkpoint.npz"
+
+
+def checkpoint_path_for(timing_json_path: str) -> str:
+    root, _ = os.path.splitext(timing_json_path)
+    return root + CHECKPOINT_SUFFIX
+
+
+def save_checkpoint(
+    checkpoint_path: str,
+    video_path: str,
+    threshold: int,
+    analysis_scale: float,
+    frame_count: int,
+    scene_list: Sequence[Dict[str, object]],
+    reference: np.ndarray,
+    reference_index: int,
+    analysis_size: Optional[Tuple[int, int]],
+    analysis_threshold: float,
+    prev_gray: Optional[np.ndarray] = None,
+    recorder: Optional[ScoreRecorder] = None,
+    frame_format: str = DEFAULT_FRAME_FORMAT,
+) -> None:
+    """
+    Persist serial extraction state after frame_count frames.
+
+    Keyframes up to this point must already be on disk; a resumed run seeks to
+    frame_count and continues with the stored reference and scenes.
+    """
+    meta = _fingerprint(video_path, threshold, analysis_scale, recorder is not None, frame_format)
+    meta.update(
+        {
+            "frame_count": int(frame_count),
+            "reference_index": int(reference_index),
+            "analysis_size": list(analysis_size) if analysis_size is not None else None,
+            "analysis_threshold": float(analysis_threshold),
+            "scenes": list(scene_list),
+        }
+    )
+    arrays = {"meta": np.array(json.dumps(meta, ensure_ascii=False)), "reference": reference}
+    if prev_gray is not None:
+        arrays["prev_gray"] = prev_gray
+    if recorder is not None:
+        arrays["kept_scores"] = np.asarray(recorder.kept_scores, dtype=np.int64)
+        arrays["prev_scores"] = np.asarray(recorder.prev_scores, dtype=np.int64)
+        arrays["references"] = np.asarray(recorder.references, dtype=np.int64)
+
+    temp_path = checkpoint_path + ".tmp.npz"
+    np.savez(temp_path, **arrays)
+    os.replace(temp_path, checkpoint_path)
+
+
+def load_checkpoint(
+    checkpoint_path: str,
+    video_path: str,
+    threshold: int,
+    analysis_scale: float,
+    record_scores: bool,
+    frame_format: str = DEFAULT_FRAME_FORMAT,
+) -> Optional[Dict[str, object]]:
+    """Return the stored state, or None when missing, unreadable or made with other settings."""
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with np.load(checkpoint_path) as data:
+            arrays = {key: data[key] for key in data.files}
+        meta = json.loads(str(arrays.pop("meta")))
+    except Exception:
+        return None
+
+    expected = _fingerprint(video_path, threshold, analysis_scale, record_scores, frame_format)
+    if any(meta.get(key) != value for key, value in expected.items()):
+        return None
+    if record_scores and "prev_gray" not in arrays and meta["frame_count"] > 0:
+        return None
+
+    analysis_size = meta.get("analysis_size")
+    state: Dict[str, object] = {
+        "frame_count": int(meta["frame_count"]),
+        "scenes": list(meta["scenes"]),
+        "reference": arrays["reference"],
+        "reference_index": int(meta["reference_index"]),
+        "analysis_size": tuple(analysis_size) if analysis_size else None,
+        "analysis_threshold": float(meta["analysis_threshold"]),
+        "prev_gray": arrays.get("prev_gray"),
+    }
+    if record_scores:
+        state["scores"] = (arrays["kept_scores"], arrays["prev_scores"], arrays["references"])
+    return state
+
+
+def clear_checkpoint(checkpoint_path: str) -> None:
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+def discard_frames_from(output_folder: str, saved_idx: int) -> List[str]:
+    """Remove keyframes numbered saved_idx and above, written after the checkpoint."""
+    removed = []
+    for file_name in os.listdir(output_folder):
+        path = os.path.join(output_folder, file_name)
+        stem, _ = os.path.splitext(file_name)
+        if stem.isdigit() and int(stem) >= saved_idx and os.path.isfile(path):
+            remove_frame(path)
+            removed.append(file_name)
+    return removed
+
+
+def _fingerprint(
+    video_path: str, threshold: int, analysis_scale: float, record_scores: bool, frame_format: str
+) -> Dict[str, object]:
+    stat = os.stat(video_path)
+    return {
+        "video_size": int(stat.st_size),
+        "video_mtime": int(stat.st_mtime),
+        "threshold": int(threshold),
+        "analysis_scale": float(analysis_scale),
+        "record_scores": bool(record_scores),
+        "frame_format": frame_format,
+    }
@@ -2,28 +2,90 @@ import argparse
 import json
 import os
 import time
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
+from extract.analysis import analysis_geometry, analysis_gray, banded_difference_score, difference_score
+from extract.checkpoint import clear_checkpoint, discard_frames_from, load_checkpoint, save_checkpoint
+from extract.formats import DEFAULT_FRAME_FORMAT, FRAME_FORMATS, frame_format_spec
+from extract.pipeline import DecodeStage, FramePool, WriterPool, write_frame
+from extract.sampling import extract_sampled
+from extract.scores import ScoreRecorder
+from extract.segments import extract_segments
+
 ProgressCallback = Callable[[int, int], None]
 
 
+def default_writer_workers() -> int:
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
 def extract_keyframes(
     video_path: str,
     output_folder: str,
     timing_json_path: str,
     threshold: int = 1_000_000,
     progress_callback: Optional[ProgressCallback] = None,
+    writer_workers: int = 0,
+    queue_size: int = 8,
+    analysis_scale: float = 1.0,
+    processes: int = 0,
+    scores_path: Optional[str] = None,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1000,
+    frame_format: str = DEFAULT_FRAME_FORMAT,
+    sample_step: int = 1,
+    frame_store: Optional[str] = None,
 ) -> Dict[str, object]:
     """
     Extract keyframes using frame-difference threshold.
 
     Lower threshold means higher sensitivity and more frames kept.
+    With writer_workers > 0, decoding runs on its own thread and keyframes are
+    encoded by a pool of writer threads; stages are linked by bounded queues of
+    queue_size frames. Output files and timing json are the same in both modes.
+
+    analysis_scale < 1 computes the difference on an area-averaged grayscale
+    proxy of that scale. The threshold is rescaled by the proxy/full pixel ratio
+    so it keeps its full-resolution meaning; keyframes are still written at
+    full resolution.
+
+    processes > 1 splits the video into frame ranges scanned by separate
+    processes (see extract.segments); scenes match the serial result.
+
+    With scores_path set, per-frame difference scores are saved there so the
+    threshold can be changed later without decoding (see extract.scores).
+
+    With checkpoint_path set, the single-pass engine saves its state every
+    checkpoint_interval frames. A later call with the same video and settings
+    seeks to the checkpoint and continues; the checkpoint is removed when
+    extraction completes. Segment-parallel runs are not checkpointed.
+
+    frame_format selects how keyframes are stored (see extract.formats); all
+    choices are lossless and differ in encode time and size on disk.
+
+    Without a score sidecar the difference is accumulated in row bands and
+    stops once it reaches the threshold; scanned_fraction in the result is the
+    average share of each compared frame that was read.
+
+    sample_step > 1 compares only every sample_step-th frame and bisects
+    intervals that changed (see extract.sampling). It is meant for footage with
+    long static holds, cannot record scores and is not checkpointed.
+
+    frame_store names a content-addressed store (see extract.frame_store):
+    keyframes are kept there once per distinct image and output_folder holds
+    links to them, so repeated extractions of the same footage neither encode
+    nor store a keyframe twice.
     """
     if not os.path.exists(video_path):
         raise FileNotFoundError(f"Video not found: {video_path}")
+    if not 0.0 < analysis_scale <= 1.0:
+        raise ValueError(f"analysis_scale must be in (0, 1]: {analysis_scale}")
+    frame_format_spec(frame_format)
+    if sample_step > 1 and (processes > 1 or scores_path):
+        raise ValueError("sample_step cannot be combined with processes or scores_path")
 
     os.makedirs(output_folder, exist_ok=True)
     os.makedirs(os.path.dirname(timing_json_path) or ".", exist_ok=True)
@@ -35,44 +97,79 @@ def extract_keyframes(
     start_time = time.time()
     fps = cap.get(cv2.CAP_PROP_FPS) or 24.0
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    recorder = ScoreRecorder() if scores_path else None
+    stage_seconds = {"decode": 0.0, "analysis": 0.0, "write": 0.0}
+    scan_rows = [0, 0]
+    resume_state = None
+    decoded_frames = None
+    if checkpoint_path and sample_step <= 1 and not (processes > 1 and total_frames > 0):
+        resume_state = load_checkpoint(
+            checkpoint_path, video_path, threshold, analysis_scale, recorder is not None, frame_format
+        )
+        if resume_state is not None:
+            discard_frames_from(output_folder, len(resume_state["scenes"]))
 
-    prev_frame = None
-    frame_count = 0
-    scene_list = []
-    saved_idx = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame_count += 1
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        is_duplicate = False
-        if prev_frame is not None:
-            diff = cv2.absdiff(prev_frame, gray)
-            score = int(np.sum(diff))
-            if score < threshold:
-                is_duplicate = True
-
-        if is_duplicate and scene_list:
-            scene_list[-1]["duration_frames"] += 1
-        else:
-            filename = f"{saved_idx:05d}.png"
-            frame_path = os.path.join(output_folder, filename)
-            cv2.imwrite(frame_path, frame)
-            scene_list.append({"filename": filename, "duration_frames": 1})
-            prev_frame = gray
-            saved_idx += 1
-
-        if progress_callback is not None:
-            progress_callback(frame_count, total_frames)
-
-    cap.release()
+    if sample_step > 1:
+        try:
+            scene_list, frame_count, decoded_frames, analysis_threshold = extract_sampled(
+                cap=cap,
+                output_folder=output_folder,
+                threshold=threshold,
+                analysis_scale=analysis_scale,
+                sample_step=sample_step,
+                total_frames=total_frames,
+                progress_callback=progress_callback,
+                stage_seconds=stage_seconds,
+                frame_format=frame_format,
+                scan_rows=scan_rows,
+                frame_store=frame_store,
+            )
+        finally:
+            cap.release()
+    elif processes > 1 and total_frames > 0:
+        cap.release()
+        scene_list, frame_count, analysis_threshold = extract_segments(
+            video_path=video_path,
+            output_folder=output_folder,
+            threshold=threshold,
+            analysis_scale=analysis_scale,
+            processes=processes,
+            total_frames=total_frames,
+            progress_callback=progress_callback,
+            recorder=recorder,
+            stage_seconds=stage_seconds,
+            frame_format=frame_format,
+            scan_rows=scan_rows,
+            frame_store=frame_store,
+        )
+    else:
+        scene_list, frame_count, analysis_threshold = _extract_serial(
+            cap=cap,
+            video_path=video_path,
+            output_folder=output_folder,
+            threshold=threshold,
+            analysis_scale=analysis_scale,
+            writer_workers=writer_workers,
+            queue_size=queue_size,
+            total_frames=total_frames,
+            progress_callback=progress_callback,
+            recorder=recorder,
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=checkpoint_interval,
+            resume_state=resume_state,
+            stage_seconds=stage_seconds,
+            frame_format=frame_format,
+            scan_rows=scan_rows,
+            frame_store=frame_store,
+        )
+    saved_idx = len(scene_list)
+    if recorder is not None and scores_path:
+        recorder.save(scores_path, threshold, analysis_threshold, analysis_scale, fps, scene_list, frame_format)
 
     with open(timing_json_path, "w", encoding="utf-8") as file:
         json.dump({"fps": fps, "scenes": scene_list}, file, indent=2, ensure_ascii=False)
+    if checkpoint_path:
+        clear_checkpoint(checkpoint_path)
 
     elapsed_seconds = time.time() - start_time
     return {
@@ -80,13 +177,192 @@ def extract_keyframes(
         "frames_dir": output_folder,
         "timing_json": timing_json_path,
         "threshold": threshold,
+        "analysis_scale": analysis_scale,
+        "analysis_threshold": analysis_threshold,
+        "frame_format": frame_format,
         "fps": fps,
         "total_frames": frame_count,
         "saved_frames": saved_idx,
+        "writer_workers": writer_workers,
+        "processes": processes,
+        "sample_step": sample_step,
+        "frame_store": frame_store,
+        "decoded_frames": frame_count if decoded_frames is None else decoded_frames,
+        "scores_path": scores_path,
+        "resumed_from_frame": int(resume_state["frame_count"]) if resume_state else 0,
+        "stage_seconds": stage_seconds,
+        "scanned_fraction": scan_rows[0] / scan_rows[1] if scan_rows[1] else 1.0,
         "elapsed_seconds": elapsed_seconds,
     }
 
 
+def _extract_serial(
+    cap: cv2.VideoCapture,
+    video_path: str,
+    output_folder: str,
+    threshold: int,
+    analysis_scale: float,
+    writer_workers: int,
+    queue_size: int,
+    total_frames: int,
+    progress_callback: Optional[ProgressCallback],
+    recorder: Optional[ScoreRecorder] = None,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1000,
+    resume_state: Optional[Dict[str, object]] = None,
+    stage_seconds: Optional[Dict[str, float]] = None,
+    frame_format: str = DEFAULT_FRAME_FORMAT,
+    scan_rows: Optional[List[int]] = None,
+    frame_store: Optional[str] = None,
+) -> Tuple[List[Dict[str, object]], int, float]:
+    # scan_rows accumulates [rows scanned, rows of compared frames].
+    scan_rows = scan_rows if scan_rows is not None else [0, 0]
+    extension, write_params = frame_format_spec(frame_format)
+    stage_seconds = stage_seconds if stage_seconds is not None else {}
+    for stage in ("decode", "analysis", "write"):
+        stage_seconds.setdefault(stage, 0.0)
+    prev_frame = None
+    prev_gray = None
+    reference_index = -1
+    analysis_size: Optional[Tuple[int, int]] = None
+    analysis_threshold = float(threshold)
+    frame_count = 0
+    scene_list: List[Dict[str, object]] = []
+    saved_idx = 0
+    # Analysis images are rotated through at most three buffers (reference,
+    # previous frame, current frame); keeping a frame swaps references only.
+    gray_buffers: List[np.ndarray] = []
+    scratch: Optional[np.ndarray] = None
+
+    if resume_state is not None:
+        frame_count = int(resume_state["frame_count"])
+        scene_list = list(resume_state["scenes"])
+        saved_idx = len(scene_list)
+        prev_frame = resume_state["reference"]
+        prev_gray = resume_state["prev_gray"]
+        reference_index = int(resume_state["reference_index"])
+        analysis_size = resume_state["analysis_size"]
+        analysis_threshold = float(resume_state["analysis_threshold"])
+        if recorder is not None:
+            recorder.extend(*resume_state["scores"])
+        gray_buffers = [buffer for buffer in (prev_frame, prev_gray) if buffer is not None]
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+
+    # Queued frames live in pooled buffers: decode queue, writer queue, frames
+    # being encoded, the one under analysis and the one being decoded.
+    frame_pool = FramePool(2 * queue_size + writer_workers + 2) if writer_workers > 0 else None
+    decoder = DecodeStage(cap, queue_size, frame_pool) if writer_workers > 0 else None
+    writer = (
+        WriterPool(writer_workers, queue_size, write_params, frame_pool, frame_store) if writer_workers > 0 else None
+    )
+    frames = decoder if decoder is not None else _read_frames(cap, stage_seconds)
+
+    try:
+        for frame in frames:
+            analysis_started = time.perf_counter()
+            frame_count += 1
+            if frame_count == 1:
+                analysis_size, analysis_threshold = analysis_geometry(frame.shape, analysis_scale, threshold)
+            if analysis_size is not None and scratch is None:
+                scratch = np.empty(frame.shape[:2], dtype=np.uint8)
+            spare = next(
+                (buffer for buffer in gray_buffers if buffer is not prev_frame and buffer is not prev_gray), None
+            )
+            gray = analysis_gray(frame, analysis_size, spare, scratch)
+            if gray is not spare:
+                gray_buffers.append(gray)
+
+            is_duplicate = False
+            score = -1
+            if prev_frame is not None:
+                if recorder is not None:
+                    score, rows = difference_score(prev_frame, gray), gray.shape[0]
+                else:
+                    score, rows = banded_difference_score(prev_frame, gray, analysis_threshold)
+                scan_rows[0] += rows
+                scan_rows[1] += gray.shape[0]
+                if score < analysis_threshold:
+                    is_duplicate = True
+
+            if recorder is not None:
+                if prev_gray is None:
+                    prev_score = -1
+                elif reference_index == frame_count - 2:
+                    prev_score = score
+                else:
+                    prev_score = difference_score(prev_gray, gray)
+                recorder.add(score, prev_score, reference_index)
+                prev_gray = gray
+            stage_seconds["analysis"] += time.perf_counter() - analysis_started
+
+            if is_duplicate and scene_list:
+                scene_list[-1]["duration_frames"] += 1
+                if frame_pool is not None:
+                    frame_pool.release(frame)
+            else:
+                filename = f"{saved_idx:05d}{extension}"
+                frame_path = os.path.join(output_folder, filename)
+                if writer is not None:
+                    writer.submit(frame_path, frame)
+                else:
+                    write_started = time.perf_counter()
+                    write_frame(frame_path, frame, write_params, frame_store)
+                    stage_seconds["write"] += time.perf_counter() - write_started
+                scene_list.append({"filename": filename, "duration_frames": 1})
+                prev_frame = gray
+                reference_index = frame_count - 1
+                saved_idx += 1
+
+            if progress_callback is not None:
+                progress_callback(frame_count, total_frames)
+
+            if checkpoint_path and frame_count % max(checkpoint_interval, 1) == 0:
+                checkpoint_started = time.perf_counter()
+                if writer is not None:
+                    writer.flush()
+                save_checkpoint(
+                    checkpoint_path,
+                    video_path=video_path,
+                    threshold=threshold,
+                    analysis_scale=analysis_scale,
+                    frame_count=frame_count,
+                    scene_list=scene_list,
+                    reference=prev_frame,
+                    reference_index=reference_index,
+                    analysis_size=analysis_size,
+                    analysis_threshold=analysis_threshold,
+                    prev_gray=prev_gray,
+                    recorder=recorder,
+                    frame_format=frame_format,
+                )
+                stage_seconds["checkpoint"] = (
+                    stage_seconds.get("checkpoint", 0.0) + time.perf_counter() - checkpoint_started
+                )
+    finally:
+        if decoder is not None:
+            decoder.close()
+            stage_seconds["decode"] += decoder.busy_seconds
+        if writer is not None:
+            writer.close()
+            stage_seconds["write"] += writer.busy_seconds
+        cap.release()
+
+    return scene_list, frame_count, analysis_threshold
+
+
+def _read_frames(cap: cv2.VideoCapture, stage_seconds: Dict[str, float]) -> Iterator[np.ndarray]:
+    # Every frame is decoded into the same buffer; the consumer must be done
+    # with a frame before asking for the next one.
+    frame = None
+    while True:
+        started = time.perf_counter()
+        ret, frame = cap.read(frame)
+        stage_seconds["decode"] += time.perf_counter() - started
+        if not ret:
+            return
+        yield frame
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Extract keyframes from a video.")
     parser.add_argument("--video", default="123.mp4", help="Path to source video file.")
@@ -98,6 +374,40 @@ def parse_args() -> argparse.Namespace:
         default=1_000_000,
         help="Difference threshold. Lower = more sensitive, more frames.",
     )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=0,
+        help="Keyframe writer threads. 0 = decode, analyze and write on one thread.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="Scan the video in this many parallel segments. 0 or 1 = single pass.",
+    )
+    parser.add_argument(
+        "--sample-step",
+        type=int,
+        default=1,
+        help="Compare every Nth frame and bisect changes. Faster on long static holds; 1 = every frame.",
+    )
+    parser.add_argument(
+        "--format",
+        default=DEFAULT_FRAME_FORMAT,
+        help=f"Keyframe storage format: {', '.join(FRAME_FORMATS)}, or png:0-9 for a PNG compression level.",
+    )
+    parser.add_argument(
+        "--analysis-scale",
+        type=float,
+        default=1.0,
+        help="Scale of the grayscale proxy used for difference analysis, e.g. 0.25. Threshold keeps its meaning.",
+    )
+    parser.add_argument(
+        "--frame-store",
+        default="",
+        help="Content-addressed store shared between extractions; keyframes are linked from it.",
+    )
     return parser.parse_args()
 
 
@@ -108,6 +418,12 @@ def main() -> None:
         output_folder=args.output_folder,
         timing_json_path=args.timing_json,
         threshold=args.threshold,
+        writer_workers=args.writers,
+        analysis_scale=args.analysis_scale,
+        processes=args.processes,
+        frame_format=args.format,
+        sample_step=args.sample_step,
+        frame_store=args.frame_store or None,
     )
     print(
         "Done. Saved "
@@ -0,0 +1,30 @@
+from typing import Dict, List, Tuple
+
+import cv2
+
+DEFAULT_FRAME_FORMAT = "png"
+
+# name -> (extension, cv2.imwrite params). All choices are lossless. OpenCV's
+# default PNG settings already encode faster than any explicit level.
+FRAME_FORMATS: Dict[str, Tuple[str, List[int]]] = {
+    "png": (".png", []),
+    "png-small": (".png", [cv2.IMWRITE_PNG_COMPRESSION, 9]),
+    "webp": (".webp", [cv2.IMWRITE_WEBP_QUALITY, 101]),
+    "bmp": (".bmp", []),
+    "tiff": (".tiff", [cv2.IMWRITE_TIFF_COMPRESSION, 1]),
+}
+
+
+def frame_format_spec(frame_format: str) -> Tuple[str, List[int]]:
+    """
+    Return (extension, imwrite params) for a format name.
+
+    Besides the names in FRAME_FORMATS, "png:N" selects PNG compression level N (0-9).
+    """
+    if frame_format in FRAME_FORMATS:
+        extension, params = FRAME_FORMATS[frame_format]
+        return extension, list(params)
+    name, _, level = frame_format.partition(":")
+    if name == "png" and level.isdigit() and 0 <= int(level) <= 9:
+        return ".png", [cv2.IMWRITE_PNG_COMPRESSION, int(level)]
+    raise ValueError(f"Unknown frame format: {frame_format}")
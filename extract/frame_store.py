@@ -0,0 +1,129 @@
+import hashlib
+import os
+import stat
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+FRAME_STORE_DIR = "frame_store"
+# Blobs younger than this are never collected: a writer may be about to link them.
+GC_GRACE_SECONDS = 60.0
+
+
+def store_frame(store_dir: str, frame_path: str, frame: np.ndarray, params: Optional[Sequence[int]] = None) -> bool:
+    """
+    Write a keyframe through a content-addressed store.
+
+    The frame is keyed by a hash of its pixels, shape and encode settings; the
+    encoded file is kept once under store_dir and every frame_path with the same
+    content is a hardlink to it. Frames already in the store are not encoded
+    again. Where the filesystem cannot link, the frame is written to frame_path
+    only and stays out of the store. Returns True when an existing blob was
+    reused.
+
+    Stored blobs are read-only so editing a linked frame in place cannot change
+    the frames of other projects; remove them with remove_frame.
+    """
+    extension = os.path.splitext(frame_path)[1].lower()
+    pixels = np.ascontiguousarray(frame)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{pixels.shape}|{pixels.dtype}|{extension}|{list(params or [])}".encode("utf-8"))
+    digest.update(pixels.data)
+    key = digest.hexdigest()
+    blob_dir = os.path.join(store_dir, key[:2])
+    blob_path = os.path.join(blob_dir, key + extension)
+
+    if os.path.exists(frame_path):
+        remove_frame(frame_path)
+    try:
+        os.link(blob_path, frame_path)
+        # Removing an old link on Windows clears the shared read-only attribute.
+        _make_read_only(blob_path)
+        return True
+    except FileNotFoundError:
+        pass
+    except OSError:
+        # The blob exists but cannot be linked here (e.g. another volume).
+        _write_frame(frame_path, pixels, params)
+        return False
+
+    # New content: the frame itself is written once and linked into the store.
+    _write_frame(frame_path, pixels, params)
+    os.makedirs(blob_dir, exist_ok=True)
+    try:
+        os.link(frame_path, blob_path)
+    except OSError:
+        # Unlinkable store, or another writer published the same blob first.
+        return False
+    _make_read_only(blob_path)
+    return False
+
+
+def remove_frame(path: str) -> None:
+    """Delete a frame that may be a read-only store link (Windows refuses those)."""
+    try:
+        os.remove(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+
+def remove_read_only(
+    function: Callable[[str], None], path: str, exc_info: Tuple[type, BaseException, object]
+) -> None:
+    """shutil.rmtree onerror handler that also deletes read-only store links."""
+    if function not in (os.unlink, os.remove):
+        raise exc_info[1]
+    remove_frame(path)
+
+
+def _write_frame(frame_path: str, pixels: np.ndarray, params: Optional[Sequence[int]]) -> None:
+    if not cv2.imwrite(frame_path, pixels, list(params or [])):
+        raise RuntimeError(f"Unable to write frame: {frame_path}")
+
+
+def _make_read_only(path: str) -> None:
+    # On Windows only the owner-read bit matters: it sets the read-only attribute.
+    os.chmod(path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+
+
+def collect_garbage(store_dir: str, grace_seconds: float = GC_GRACE_SECONDS) -> Dict[str, int]:
+    """
+    Remove blobs no project links to any more.
+
+    A blob's hardlink count is its reference count: frames/ entries of every
+    project (and modified images synced as links) hold one each, the store
+    holds the last. Blobs only the store holds, and leftover temp files, are
+    deleted once older than grace_seconds.
+
+    On Windows a removed link must be made writable first, which clears the
+    read-only attribute of the shared file; surviving blobs are marked
+    read-only again here.
+    """
+    result = {"blobs": 0, "removed": 0, "freed_bytes": 0}
+    if not os.path.isdir(store_dir):
+        return result
+    cutoff = time.time() - grace_seconds
+    for shard in os.scandir(store_dir):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            try:
+                # DirEntry.stat() reports st_nlink as 0 on Windows.
+                info = os.stat(entry.path)
+            except OSError:
+                continue
+            result["blobs"] += 1
+            if info.st_mtime > cutoff or (info.st_nlink > 1 and ".tmp" not in entry.name):
+                if info.st_mode & stat.S_IWRITE and ".tmp" not in entry.name:
+                    _make_read_only(entry.path)
+                continue
+            try:
+                remove_frame(entry.path)
+            except OSError:
+                continue
+            result["removed"] += 1
+            result["freed_bytes"] += info.st_size
+    return result
@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 from pathlib import Path
 
@@ -5,6 +6,7 @@ from PySide6.QtWidgets import QApplication
 
 
 def main() -> int:
+    multiprocessing.freeze_support()
     if getattr(sys, "frozen", False):
         workspace_root = Path(sys.executable).resolve().parent
         project_root = Path(getattr(sys, "_MEIPASS", workspace_root))
@@ -0,0 +1,182 @@
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from extract.frame_store import store_frame
+
+_END = object()
+
+
+def write_frame(
+    frame_path: str,
+    frame: np.ndarray,
+    params: Optional[Sequence[int]] = None,
+    store_dir: Optional[str] = None,
+) -> None:
+    """Encode a keyframe to frame_path, through the frame store in store_dir when given."""
+    if store_dir:
+        store_frame(store_dir, frame_path, frame, params)
+        return
+    if not cv2.imwrite(frame_path, frame, list(params or [])):
+        raise RuntimeError(f"Unable to write frame: {frame_path}")
+
+
+class FramePool:
+    """
+    Up to size reusable frame buffers. acquire() returns None while fewer than
+    size buffers exist, so the caller allocates one (e.g. cap.read() without a
+    destination) and later hands it over with release().
+    """
+
+    def __init__(self, size: int) -> None:
+        self._free: "queue.Queue[np.ndarray]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._unallocated = max(1, size)
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """Raise queue.Empty when no buffer was released within timeout."""
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._unallocated > 0:
+                self._unallocated -= 1
+                return None
+        return self._free.get(timeout=timeout)
+
+    def release(self, frame: np.ndarray) -> None:
+        self._free.put(frame)
+
+
+class DecodeStage:
+    """
+    Read frames from an opened capture on a background thread into a bounded queue.
+
+    With a FramePool, frames are decoded into pooled buffers; the consumer must
+    release each frame (directly or through WriterPool) once done with it.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, queue_size: int, pool: Optional[FramePool] = None) -> None:
+        self._cap = cap
+        self._pool = pool
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self.busy_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="extract-decode", daemon=True)
+        self._thread.start()
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                break
+            yield item  # type: ignore[misc]
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                buffer = None
+                if self._pool is not None:
+                    try:
+                        buffer = self._pool.acquire(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                started = time.perf_counter()
+                ret, frame = self._cap.read(buffer)
+                self.busy_seconds += time.perf_counter() - started
+                if not ret:
+                    break
+                self._put(frame)
+        except Exception as exc:
+            self._error = exc
+        finally:
+            self._put(_END)
+
+    def _put(self, item: object) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+class WriterPool:
+    """
+    Encode and write keyframes on a fixed number of threads fed by a bounded queue.
+
+    With a FramePool, each frame is released to it once written.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        params: Optional[Sequence[int]] = None,
+        pool: Optional[FramePool] = None,
+        store_dir: Optional[str] = None,
+    ) -> None:
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, queue_size))
+        self._params = list(params or [])
+        self._store_dir = store_dir
+        self._pool = pool
+        self._errors: List[BaseException] = []
+        self._busy_lock = threading.Lock()
+        self.busy_seconds = 0.0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"extract-writer-{idx}", daemon=True)
+            for idx in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, frame_path: str, frame: np.ndarray) -> None:
+        if self._errors:
+            raise self._errors[0]
+        self._queue.put((frame_path, frame))
+
+    def flush(self) -> None:
+        """Block until every submitted frame has been written."""
+        self._queue.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._queue.put(_END)
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _END:
+                    return
+                if self._errors:
+                    continue
+                frame_path, frame = item  # type: ignore[misc]
+                started = time.perf_counter()
+                write_frame(frame_path, frame, self._params, self._store_dir)
+                with self._busy_lock:
+                    self.busy_seconds += time.perf_counter() - started
+            except Exception as exc:
+                self._errors.append(exc)
+            finally:
+                if self._pool is not None and item is not _END:
+                    self._pool.release(item[1])  # type: ignore[index]
+                self._queue.task_done()
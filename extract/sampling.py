@@ -0,0 +1,172 @@
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from extract.analysis import analysis_geometry, analysis_gray, banded_difference_score
+from extract.formats import DEFAULT_FRAME_FORMAT, frame_format_spec
+from extract.pipeline import write_frame
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def extract_sampled(
+    cap: cv2.VideoCapture,
+    output_folder: str,
+    threshold: int,
+    analysis_scale: float,
+    sample_step: int,
+    total_frames: int,
+    progress_callback: Optional[ProgressCallback] = None,
+    stage_seconds: Optional[Dict[str, float]] = None,
+    frame_format: str = DEFAULT_FRAME_FORMAT,
+    scan_rows: Optional[List[int]] = None,
+    frame_store: Optional[str] = None,
+) -> Tuple[List[Dict[str, object]], int, int, float]:
+    """
+    Coarse-to-fine hold detection.
+
+    Every sample_step-th frame is compared with the current keyframe; frames in
+    between are skipped with grab(). When a sample differs, the interval since
+    the last matching sample is bisected to the first differing frame, which
+    becomes the next keyframe. This assumes a frame that differs from the
+    keyframe is not followed by one that matches it again within the same
+    interval, so short flashes inside a hold can be missed. Durations still
+    add up to the exact frame count of the stream.
+
+    Returns (scene_list, frame_count, decoded_frames, analysis_threshold).
+    """
+    stage_seconds = stage_seconds if stage_seconds is not None else {}
+    for stage in ("decode", "analysis", "write"):
+        stage_seconds.setdefault(stage, 0.0)
+    scan_rows = scan_rows if scan_rows is not None else [0, 0]
+    extension, write_params = frame_format_spec(frame_format)
+    reader = _IndexedReader(cap, stage_seconds)
+
+    first = reader.read(0)
+    if first is None:
+        return [], 0, reader.decoded, float(threshold)
+    analysis_size, analysis_threshold = analysis_geometry(first.shape, analysis_scale, threshold)
+
+    reference = analysis_gray(first, analysis_size)
+    keyframes: List[int] = [0]
+    _write_keyframe(output_folder, 0, extension, first, write_params, stage_seconds, frame_store)
+    matched = 0
+    while reader.end is None or matched < reader.end - 1:
+        probe = matched + max(sample_step, 1)
+        frame = reader.read(probe)
+        if frame is None:
+            probe = reader.end - 1
+            if probe <= matched:
+                break
+            frame = reader.read_again(probe)
+        is_changed, gray = _compare(reference, frame, analysis_size, analysis_threshold, stage_seconds, scan_rows)
+        if not is_changed:
+            matched = probe
+        else:
+            low, high, high_frame, high_gray = matched, probe, frame, gray
+            while high - low > 1:
+                middle = (low + high) // 2
+                middle_frame = reader.read_again(middle)
+                is_changed, middle_gray = _compare(
+                    reference, middle_frame, analysis_size, analysis_threshold, stage_seconds, scan_rows
+                )
+                if is_changed:
+                    high, high_frame, high_gray = middle, middle_frame, middle_gray
+                else:
+                    low = middle
+            _write_keyframe(
+                output_folder, len(keyframes), extension, high_frame, write_params, stage_seconds, frame_store
+            )
+            keyframes.append(high)
+            reference = high_gray
+            matched = high
+        if progress_callback is not None:
+            progress_callback(min(matched + 1, total_frames) if total_frames else matched + 1, total_frames)
+
+    frame_count = int(reader.end)
+    scene_list: List[Dict[str, object]] = []
+    for saved_idx, frame_index in enumerate(keyframes):
+        next_index = keyframes[saved_idx + 1] if saved_idx + 1 < len(keyframes) else frame_count
+        scene_list.append({"filename": f"{saved_idx:05d}{extension}", "duration_frames": next_index - frame_index})
+    if progress_callback is not None:
+        progress_callback(frame_count, total_frames)
+    return scene_list, frame_count, reader.decoded, analysis_threshold
+
+
+def _compare(
+    reference: np.ndarray,
+    frame: np.ndarray,
+    analysis_size: Optional[Tuple[int, int]],
+    analysis_threshold: float,
+    stage_seconds: Dict[str, float],
+    scan_rows: List[int],
+) -> Tuple[bool, np.ndarray]:
+    started = time.perf_counter()
+    gray = analysis_gray(frame, analysis_size)
+    score, rows = banded_difference_score(reference, gray, analysis_threshold)
+    scan_rows[0] += rows
+    scan_rows[1] += gray.shape[0]
+    stage_seconds["analysis"] += time.perf_counter() - started
+    return score >= analysis_threshold, gray
+
+
+def _write_keyframe(
+    output_folder: str,
+    saved_idx: int,
+    extension: str,
+    frame: np.ndarray,
+    write_params: List[int],
+    stage_seconds: Dict[str, float],
+    frame_store: Optional[str] = None,
+) -> None:
+    started = time.perf_counter()
+    write_frame(os.path.join(output_folder, f"{saved_idx:05d}{extension}"), frame, write_params, frame_store)
+    stage_seconds["write"] += time.perf_counter() - started
+
+
+class _IndexedReader:
+    """
+    Random access to frames. Forward moves always grab() so the end of the
+    stream is found exactly; only moves back to already seen frames seek.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, stage_seconds: Dict[str, float]) -> None:
+        self._cap = cap
+        self._stage_seconds = stage_seconds
+        self._position = 0
+        self.end: Optional[int] = None
+        self.decoded = 0
+
+    def read(self, frame_index: int) -> Optional[np.ndarray]:
+        """Return the frame, or None when it lies past the end of the stream (end is then set)."""
+        if self.end is not None and frame_index >= self.end:
+            return None
+        started = time.perf_counter()
+        try:
+            if frame_index < self._position:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+                self._position = frame_index
+            while self._position < frame_index:
+                if not self._cap.grab():
+                    self.end = self._position
+                    return None
+                self._position += 1
+            ret, frame = self._cap.read()
+            if not ret:
+                self.end = frame_index
+                return None
+            self._position += 1
+            self.decoded += 1
+            return frame
+        finally:
+            self._stage_seconds["decode"] += time.perf_counter() - started
+
+    def read_again(self, frame_index: int) -> np.ndarray:
+        # For frames before a position already reached, which must exist.
+        frame = self.read(frame_index)
+        if frame is None:
+            raise RuntimeError(f"Unable to re-read frame {frame_index}")
+        return frame
@@ -0,0 +1,409 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from extract.analysis import analysis_geometry, analysis_gray, difference_score
+from extract.formats import DEFAULT_FRAME_FORMAT, frame_format_spec
+from extract.frame_store import remove_frame, remove_read_only
+from extract.pipeline import write_frame
+
+ProgressCallback = Callable[[int, int], None]
+
+SCORES_SUFFIX = ".scores.npz"
+SEEK_GAP_FRAMES = 240
+# Past this share of undecidable frames a fresh extraction is cheaper than resolving them.
+FALLBACK_AMBIGUOUS_SHARE = 0.5
+
+
+def scores_path_for(timing_json_path: str) -> str:
+    root, _ = os.path.splitext(timing_json_path)
+    return root + SCORES_SUFFIX
+
+
+def keyframe_indices(scene_list: Sequence[Dict[str, object]]) -> List[int]:
+    indices = []
+    position = 0
+    for scene in scene_list:
+        indices.append(position)
+        position += int(scene.get("duration_frames", 1))
+    return indices
+
+
+class ScoreRecorder:
+    """
+    Per-frame difference scores of one extraction pass.
+
+    kept_scores[i] is the score of frame i against the kept frame it was
+    compared with (references[i]); prev_scores[i] is the score against frame
+    i - 1. Both are -1 where no comparison exists. Scores are in analysis
+    units, i.e. comparable to threshold * threshold_scale.
+    """
+
+    def __init__(self) -> None:
+        self.kept_scores: List[int] = []
+        self.prev_scores: List[int] = []
+        self.references: List[int] = []
+
+    def add(self, kept_score: int, prev_score: int, reference: int) -> None:
+        self.kept_scores.append(int(kept_score))
+        self.prev_scores.append(int(prev_score))
+        self.references.append(int(reference))
+
+    def extend(self, kept_scores: Sequence[int], prev_scores: Sequence[int], references: Sequence[int]) -> None:
+        self.kept_scores.extend(int(value) for value in kept_scores)
+        self.prev_scores.extend(int(value) for value in prev_scores)
+        self.references.extend(int(value) for value in references)
+
+    def save(
+        self,
+        scores_path: str,
+        threshold: int,
+        analysis_threshold: float,
+        analysis_scale: float,
+        fps: float,
+        scene_list: Sequence[Dict[str, object]],
+        frame_format: str = DEFAULT_FRAME_FORMAT,
+    ) -> None:
+        _save_scores(
+            scores_path,
+            {
+                "kept_scores": np.asarray(self.kept_scores, dtype=np.int64),
+                "prev_scores": np.asarray(self.prev_scores, dtype=np.int64),
+                "references": np.asarray(self.references, dtype=np.int64),
+                "keyframes": np.asarray(keyframe_indices(scene_list), dtype=np.int64),
+                "threshold": np.int64(threshold),
+                "threshold_scale": np.float64(analysis_threshold / threshold if threshold else 1.0),
+                "analysis_scale": np.float64(analysis_scale),
+                "fps": np.float64(fps),
+                "frame_format": np.array(frame_format),
+            },
+        )
+
+
+def stored_frame_format(scores: Dict[str, np.ndarray]) -> str:
+    # Sidecars written before frame formats existed describe PNG keyframes.
+    return str(scores["frame_format"]) if "frame_format" in scores else DEFAULT_FRAME_FORMAT
+
+
+def load_scores(scores_path: str) -> Dict[str, np.ndarray]:
+    if not os.path.exists(scores_path):
+        raise FileNotFoundError(f"Score sidecar not found: {scores_path}")
+    with np.load(scores_path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def rethreshold(
+    scores: Dict[str, np.ndarray],
+    threshold: int,
+    resolver: Optional[Callable[[int, int], int]] = None,
+) -> Dict[str, object]:
+    """
+    Recompute keyframes and scenes for a new threshold from recorded scores.
+
+    While the new reference chain matches the recorded one the recorded score is
+    exact. Otherwise the score against the new reference is bounded with the
+    triangle inequality (accumulated frame-to-frame scores, and the recorded
+    scores against a shared reference). Decisions the bounds cannot settle are
+    passed to resolver(reference, frame) when given, which returns the exact
+    score; without a resolver the frame is kept and counted in ambiguous_frames.
+    """
+    kept_scores = scores["kept_scores"].tolist()
+    references = scores["references"].tolist()
+    drift = np.concatenate(([0], np.cumsum(np.maximum(scores["prev_scores"], 0)))).tolist()
+    limit = threshold * float(scores["threshold_scale"])
+    extension, _ = frame_format_spec(stored_frame_format(scores))
+
+    keyframes: List[int] = []
+    ambiguous = 0
+    resolved = 0
+    reference = -1
+    for index, recorded_reference in enumerate(references):
+        if reference < 0:
+            keep = True
+        elif recorded_reference == reference:
+            keep = kept_scores[index] >= limit
+        else:
+            upper = drift[index + 1] - drift[reference + 1]
+            lower = 0
+            shared = _shared_reference_score(kept_scores, references, reference, recorded_reference)
+            if shared is not None:
+                upper = min(upper, kept_scores[index] + shared)
+                lower = abs(kept_scores[index] - shared)
+            if lower >= limit:
+                keep = True
+            elif upper < limit:
+                keep = False
+            elif resolver is not None:
+                keep = resolver(reference, index) >= limit
+                resolved += 1
+            else:
+                keep = True
+                ambiguous += 1
+        if keep:
+            keyframes.append(index)
+            reference = index
+
+    total_frames = len(references)
+    scenes = []
+    for saved_idx, frame_index in enumerate(keyframes):
+        next_index = keyframes[saved_idx + 1] if saved_idx + 1 < len(keyframes) else total_frames
+        scenes.append({"filename": f"{saved_idx:05d}{extension}", "duration_frames": next_index - frame_index})
+    return {
+        "threshold": threshold,
+        "keyframes": keyframes,
+        "scenes": scenes,
+        "total_frames": total_frames,
+        "saved_frames": len(keyframes),
+        "ambiguous_frames": ambiguous,
+        "resolved_frames": resolved,
+        "exact": ambiguous == 0,
+    }
+
+
+def apply_threshold(
+    video_path: str,
+    frames_dir: str,
+    timing_json_path: str,
+    threshold: int,
+    progress_callback: Optional[ProgressCallback] = None,
+    frame_store: Optional[str] = None,
+) -> Dict[str, object]:
+    """
+    Re-threshold an extracted project in place.
+
+    Keyframes shared with the previous result are renamed; only frames that are
+    new keyframes, or whose decision the recorded scores cannot settle, are
+    decoded (and written through frame_store when given). Timing json and
+    sidecar are updated. When most decisions cannot be settled from the scores
+    the video is extracted again instead (extracted_again in the result).
+    """
+    start_time = time.time()
+    scores_path = scores_path_for(timing_json_path)
+    scores = load_scores(scores_path)
+    estimate = rethreshold(scores, threshold)
+    if estimate["ambiguous_frames"] > estimate["total_frames"] * FALLBACK_AMBIGUOUS_SHARE:
+        return _extract_again(
+            video_path, frames_dir, timing_json_path, threshold, scores, progress_callback, frame_store
+        )
+    reader = _GrayReader(video_path, float(scores["analysis_scale"]), threshold)
+    try:
+        plan = rethreshold(scores, threshold, resolver=reader.score)
+    finally:
+        reader.close()
+
+    frame_format = stored_frame_format(scores)
+    extension, _ = frame_format_spec(frame_format)
+    old_keys = scores["keyframes"].tolist()
+    new_keys: List[int] = plan["keyframes"]
+    old_names = {frame_index: f"{saved_idx:05d}{extension}" for saved_idx, frame_index in enumerate(old_keys)}
+    reusable = {
+        frame_index
+        for frame_index in new_keys
+        if frame_index in old_names and os.path.exists(os.path.join(frames_dir, old_names[frame_index]))
+    }
+    missing = [frame_index for frame_index in new_keys if frame_index not in reusable]
+
+    staging_dir = tempfile.mkdtemp(prefix=".rethreshold_", dir=frames_dir)
+    # (from, to) renames done so far; undone in reverse if any step fails, so the
+    # previous keyframes are never lost. Dropped keyframes are only deleted with
+    # the staging dir once every new keyframe is in place.
+    renames: List[Tuple[str, str]] = []
+    try:
+        _decode_frames(video_path, missing, staging_dir, frame_format, progress_callback, frame_store)
+        for frame_index, filename in old_names.items():
+            path = os.path.join(frames_dir, filename)
+            if frame_index in reusable:
+                staged = os.path.join(staging_dir, _staged_name(frame_index, extension))
+            elif os.path.exists(path):
+                staged = os.path.join(staging_dir, "dropped_" + filename)
+            else:
+                continue
+            os.replace(path, staged)
+            renames.append((path, staged))
+        for saved_idx, frame_index in enumerate(new_keys):
+            staged = os.path.join(staging_dir, _staged_name(frame_index, extension))
+            target = os.path.join(frames_dir, f"{saved_idx:05d}{extension}")
+            os.replace(staged, target)
+            renames.append((staged, target))
+    except BaseException:
+        for source, target in reversed(renames):
+            os.replace(target, source)
+        shutil.rmtree(staging_dir, onerror=remove_read_only)
+        raise
+    shutil.rmtree(staging_dir, onerror=remove_read_only)
+
+    fps = float(scores["fps"])
+    with open(timing_json_path, "w", encoding="utf-8") as file:
+        json.dump({"fps": fps, "scenes": plan["scenes"]}, file, indent=2, ensure_ascii=False)
+    scores["keyframes"] = np.asarray(new_keys, dtype=np.int64)
+    scores["threshold"] = np.int64(threshold)
+    _save_scores(scores_path, scores)
+
+    return {
+        "video_path": video_path,
+        "frames_dir": frames_dir,
+        "timing_json": timing_json_path,
+        "threshold": threshold,
+        "fps": fps,
+        "total_frames": plan["total_frames"],
+        "saved_frames": plan["saved_frames"],
+        "reused_frames": len(reusable),
+        "decoded_frames": len(missing),
+        "resolved_frames": plan["resolved_frames"],
+        "extracted_again": False,
+        "elapsed_seconds": time.time() - start_time,
+    }
+
+
+def _extract_again(
+    video_path: str,
+    frames_dir: str,
+    timing_json_path: str,
+    threshold: int,
+    scores: Dict[str, np.ndarray],
+    progress_callback: Optional[ProgressCallback],
+    frame_store: Optional[str],
+) -> Dict[str, object]:
+    # Imported here: extract.extract records scores through this module.
+    from extract.extract import extract_keyframes
+
+    frame_format = stored_frame_format(scores)
+    extension, _ = frame_format_spec(frame_format)
+    for saved_idx in range(len(scores["keyframes"])):
+        path = os.path.join(frames_dir, f"{saved_idx:05d}{extension}")
+        if os.path.exists(path):
+            remove_frame(path)
+    result = extract_keyframes(
+        video_path=video_path,
+        output_folder=frames_dir,
+        timing_json_path=timing_json_path,
+        threshold=threshold,
+        progress_callback=progress_callback,
+        analysis_scale=float(scores["analysis_scale"]),
+        scores_path=scores_path_for(timing_json_path),
+        frame_format=frame_format,
+        frame_store=frame_store,
+    )
+    result["extracted_again"] = True
+    return result
+
+
+class _GrayReader:
+    """
+    Decode analysis grays for resolving ambiguous decisions.
+
+    rethreshold asks for frames in increasing order and its reference is
+    always an earlier frame, so the video is read once, forward; the current
+    reference and the last decoded frame stay in memory.
+    """
+
+    def __init__(self, video_path: str, analysis_scale: float, threshold: int) -> None:
+        self._video_path = video_path
+        self._analysis_scale = analysis_scale
+        self._threshold = threshold
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._position = 0
+        self._analysis_size = None
+        self._reference: Optional[Tuple[int, np.ndarray]] = None
+        self._last: Optional[Tuple[int, np.ndarray]] = None
+
+    def score(self, reference: int, frame_index: int) -> int:
+        if self._reference is None or self._reference[0] != reference:
+            self._reference = (reference, self._gray(reference))
+        return difference_score(self._reference[1], self._gray(frame_index))
+
+    def close(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def _gray(self, frame_index: int) -> np.ndarray:
+        if self._last is not None and self._last[0] == frame_index:
+            return self._last[1]
+        if frame_index < self._position:
+            raise RuntimeError(f"Frame {frame_index} requested after frame {self._position - 1}")
+        if self._cap is None:
+            self._cap = cv2.VideoCapture(self._video_path)
+            if not self._cap.isOpened():
+                raise RuntimeError(f"Unable to open video: {self._video_path}")
+        if frame_index - self._position > SEEK_GAP_FRAMES:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            self._position = frame_index
+        while self._position < frame_index:
+            if not self._cap.grab():
+                raise RuntimeError(f"Unable to reach frame {frame_index} of {self._video_path}")
+            self._position += 1
+        ret, frame = self._cap.read()
+        if not ret:
+            raise RuntimeError(f"Unable to read frame {frame_index} of {self._video_path}")
+        self._position += 1
+        if self._analysis_size is None:
+            self._analysis_size, _ = analysis_geometry(frame.shape, self._analysis_scale, self._threshold)
+        gray = analysis_gray(frame, self._analysis_size)
+        self._last = (frame_index, gray)
+        return gray
+
+
+def _shared_reference_score(
+    kept_scores: List[int], references: List[int], reference: int, recorded_reference: int
+) -> Optional[int]:
+    # Score between the new reference and the frame's recorded reference, when recorded.
+    if references[reference] == recorded_reference:
+        return kept_scores[reference]
+    if recorded_reference >= 0 and references[recorded_reference] == reference:
+        return kept_scores[recorded_reference]
+    return None
+
+
+def _decode_frames(
+    video_path: str,
+    frame_indices: List[int],
+    output_dir: str,
+    frame_format: str,
+    progress_callback: Optional[ProgressCallback],
+    frame_store: Optional[str] = None,
+) -> None:
+    if not frame_indices:
+        return
+    extension, write_params = frame_format_spec(frame_format)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Unable to open video: {video_path}")
+    position = 0
+    try:
+        for done, frame_index in enumerate(frame_indices, start=1):
+            if frame_index - position > SEEK_GAP_FRAMES:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+                position = frame_index
+            while position < frame_index:
+                if not cap.grab():
+                    raise RuntimeError(f"Unable to reach frame {frame_index} of {video_path}")
+                position += 1
+            ret, frame = cap.read()
+            if not ret:
+                raise RuntimeError(f"Unable to read frame {frame_index} of {video_path}")
+            position += 1
+            write_frame(
+                os.path.join(output_dir, _staged_name(frame_index, extension)), frame, write_params, frame_store
+            )
+            if progress_callback is not None:
+                progress_callback(done, len(frame_indices))
+    finally:
+        cap.release()
+
+
+def _save_scores(scores_path: str, arrays: Dict[str, np.ndarray]) -> None:
+    os.makedirs(os.path.dirname(scores_path) or ".", exist_ok=True)
+    temp_path = scores_path + ".tmp.npz"
+    np.savez_compressed(temp_path, **arrays)
+    os.replace(temp_path, scores_path)
+
+
+def _staged_name(frame_index: int, extension: str) -> str:
+    return f"{frame_index:08d}{extension}"
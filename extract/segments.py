@@ -0,0 +1,353 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from extract.analysis import analysis_geometry, analysis_gray, banded_difference_score, difference_score
+from extract.formats import DEFAULT_FRAME_FORMAT, frame_format_spec
+from extract.frame_store import remove_frame, remove_read_only
+from extract.pipeline import write_frame
+from extract.scores import ScoreRecorder
+
+ProgressCallback = Callable[[int, int], None]
+
+MIN_SEGMENT_FRAMES = 240
+
+_progress_counter = None
+
+
+def plan_segments(total_frames: int, processes: int) -> List[Tuple[int, Optional[int]]]:
+    """Split [0, total_frames) into contiguous ranges; the last range reads to end of stream."""
+    count = max(1, min(processes, total_frames // MIN_SEGMENT_FRAMES))
+    bounds = [total_frames * idx // count for idx in range(count + 1)]
+    segments: List[Tuple[int, Optional[int]]] = [(bounds[idx], bounds[idx + 1]) for idx in range(count)]
+    segments[-1] = (segments[-1][0], None)
+    return segments
+
+
+def extract_segments(
+    video_path: str,
+    output_folder: str,
+    threshold: int,
+    analysis_scale: float,
+    processes: int,
+    total_frames: int,
+    progress_callback: Optional[ProgressCallback] = None,
+    recorder: Optional[ScoreRecorder] = None,
+    stage_seconds: Optional[Dict[str, float]] = None,
+    frame_format: str = DEFAULT_FRAME_FORMAT,
+    scan_rows: Optional[List[int]] = None,
+    frame_store: Optional[str] = None,
+) -> Tuple[List[Dict[str, object]], int, float]:
+    """
+    Run the hold-frame detector on frame ranges in parallel processes.
+
+    Each worker seeks to its range, treats the first frame as a keyframe and
+    stages keyframes by absolute frame index. Stitching compares a range's first
+    frame against the previous range's last kept frame; when it is a duplicate,
+    the range head is rescanned with the correct reference until it kept the
+    same frame as the worker, after which both runs agree. Staged files are
+    then renamed to contiguous 00000, 00001... names. Recorded scores are patched
+    the same way so the sidecar matches a serial pass.
+
+    stage_seconds accumulates worker decode/analysis/write time summed over all
+    processes, plus the time spent stitching in this process. scan_rows
+    accumulates the workers' [rows scanned, rows of compared frames].
+    """
+    stage_seconds = stage_seconds if stage_seconds is not None else {}
+    scan_rows = scan_rows if scan_rows is not None else [0, 0]
+    extension, _ = frame_format_spec(frame_format)
+    segments = plan_segments(total_frames, processes)
+    staging_dir = tempfile.mkdtemp(prefix=".segments_", dir=output_folder)
+    try:
+        results = _run_workers(
+            video_path,
+            staging_dir,
+            threshold,
+            analysis_scale,
+            segments,
+            total_frames,
+            progress_callback,
+            recorder is not None,
+            frame_format,
+            frame_store,
+        )
+
+        for result in results:
+            for stage, seconds in result["stage_seconds"].items():
+                stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+            scan_rows[0] += result["scan_rows"][0]
+            scan_rows[1] += result["scan_rows"][1]
+        stitch_started = time.perf_counter()
+
+        keyframes: List[int] = []
+        reference: Optional[np.ndarray] = None
+        last_gray: Optional[np.ndarray] = None
+        frame_count = 0
+        analysis_threshold = float(threshold)
+        for result in results:
+            if result["end"] == result["start"]:
+                continue
+            if result["start"] != frame_count:
+                raise RuntimeError(f"Segment starting at frame {result['start']} does not follow frame {frame_count}.")
+            analysis_threshold = float(result["analysis_threshold"])
+            overrides: List[Tuple[int, int]] = []
+            if reference is None:
+                segment_keys, reference = result["keyframes"], result["reference"]
+            else:
+                boundary_score = difference_score(reference, result["first_gray"])
+                overrides.append((boundary_score, keyframes[-1]))
+                if boundary_score < analysis_threshold:
+                    segment_keys, reference = _reconcile_segment(
+                        video_path,
+                        staging_dir,
+                        result,
+                        reference,
+                        keyframes[-1],
+                        analysis_threshold,
+                        overrides,
+                        frame_format,
+                        frame_store,
+                    )
+                else:
+                    segment_keys, reference = result["keyframes"], result["reference"]
+            if recorder is not None:
+                _record_segment(recorder, result, last_gray, overrides)
+            keyframes.extend(segment_keys)
+            last_gray = result["last_gray"]
+            frame_count = int(result["end"])
+
+        scene_list: List[Dict[str, object]] = []
+        for saved_idx, frame_index in enumerate(keyframes):
+            filename = f"{saved_idx:05d}{extension}"
+            os.replace(
+                os.path.join(staging_dir, _staged_name(frame_index, extension)), os.path.join(output_folder, filename)
+            )
+            next_index = keyframes[saved_idx + 1] if saved_idx + 1 < len(keyframes) else frame_count
+            scene_list.append({"filename": filename, "duration_frames": next_index - frame_index})
+        stage_seconds["stitch"] = time.perf_counter() - stitch_started
+    finally:
+        shutil.rmtree(staging_dir, onerror=remove_read_only)
+
+    if progress_callback is not None:
+        progress_callback(frame_count, total_frames)
+    return scene_list, frame_count, analysis_threshold
+
+
+def _run_workers(
+    video_path: str,
+    staging_dir: str,
+    threshold: int,
+    analysis_scale: float,
+    segments: List[Tuple[int, Optional[int]]],
+    total_frames: int,
+    progress_callback: Optional[ProgressCallback],
+    record_scores: bool,
+    frame_format: str,
+    frame_store: Optional[str] = None,
+) -> List[Dict[str, object]]:
+    context = multiprocessing.get_context("spawn")
+    counter = context.Value("q", 0)
+    with ProcessPoolExecutor(
+        max_workers=len(segments), mp_context=context, initializer=_init_worker, initargs=(counter,)
+    ) as pool:
+        futures = [
+            pool.submit(
+                _scan_segment,
+                video_path,
+                start,
+                stop,
+                staging_dir,
+                threshold,
+                analysis_scale,
+                record_scores,
+                frame_format,
+                frame_store,
+            )
+            for start, stop in segments
+        ]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=0.2)
+            if progress_callback is not None:
+                progress_callback(min(int(counter.value), total_frames), total_frames)
+        return [future.result() for future in futures]
+
+
+def _init_worker(counter) -> None:
+    global _progress_counter
+    _progress_counter = counter
+
+
+def _report_progress(frames: int) -> None:
+    if _progress_counter is None or frames <= 0:
+        return
+    with _progress_counter.get_lock():
+        _progress_counter.value += frames
+
+
+def _scan_segment(
+    video_path: str,
+    start: int,
+    stop: Optional[int],
+    staging_dir: str,
+    threshold: int,
+    analysis_scale: float,
+    record_scores: bool,
+    frame_format: str = DEFAULT_FRAME_FORMAT,
+    frame_store: Optional[str] = None,
+) -> Dict[str, object]:
+    extension, write_params = frame_format_spec(frame_format)
+    cap = _open_at(video_path, start)
+    analysis_size: Optional[Tuple[int, int]] = None
+    analysis_threshold = float(threshold)
+    keyframes: List[int] = []
+    first_gray: Optional[np.ndarray] = None
+    reference: Optional[np.ndarray] = None
+    last_gray: Optional[np.ndarray] = None
+    recorder = ScoreRecorder() if record_scores else None
+    stage_seconds = {"decode": 0.0, "analysis": 0.0, "write": 0.0}
+    scan_rows = [0, 0]
+    index = start
+    unreported = 0
+    try:
+        while stop is None or index < stop:
+            started = time.perf_counter()
+            ret, frame = cap.read()
+            stage_seconds["decode"] += time.perf_counter() - started
+            if not ret:
+                break
+            started = time.perf_counter()
+            if first_gray is None:
+                analysis_size, analysis_threshold = analysis_geometry(frame.shape, analysis_scale, threshold)
+            gray = analysis_gray(frame, analysis_size)
+            if first_gray is None:
+                first_gray = gray
+            score = -1
+            if reference is not None:
+                if recorder is not None:
+                    score, rows = difference_score(reference, gray), gray.shape[0]
+                else:
+                    score, rows = banded_difference_score(reference, gray, analysis_threshold)
+                scan_rows[0] += rows
+                scan_rows[1] += gray.shape[0]
+            if recorder is not None:
+                if last_gray is None:
+                    prev_score = -1
+                elif keyframes[-1] == index - 1:
+                    prev_score = score
+                else:
+                    prev_score = difference_score(last_gray, gray)
+                recorder.add(score, prev_score, keyframes[-1] if keyframes else -1)
+            stage_seconds["analysis"] += time.perf_counter() - started
+            if reference is None or score >= analysis_threshold:
+                started = time.perf_counter()
+                write_frame(
+                    os.path.join(staging_dir, _staged_name(index, extension)), frame, write_params, frame_store
+                )
+                stage_seconds["write"] += time.perf_counter() - started
+                keyframes.append(index)
+                reference = gray
+            last_gray = gray
+            index += 1
+            unreported += 1
+            if unreported >= 32:
+                _report_progress(unreported)
+                unreported = 0
+    finally:
+        cap.release()
+    _report_progress(unreported)
+
+    return {
+        "start": start,
+        "end": index,
+        "keyframes": keyframes,
+        "first_gray": first_gray,
+        "reference": reference,
+        "last_gray": last_gray,
+        "analysis_size": analysis_size,
+        "analysis_threshold": analysis_threshold,
+        "stage_seconds": stage_seconds,
+        "scan_rows": scan_rows,
+        "scores": (recorder.kept_scores, recorder.prev_scores, recorder.references) if recorder is not None else None,
+    }
+
+
+def _record_segment(
+    recorder: ScoreRecorder,
+    result: Dict[str, object],
+    previous_gray: Optional[np.ndarray],
+    overrides: List[Tuple[int, int]],
+) -> None:
+    kept_scores, prev_scores, references = (list(values) for values in result["scores"])
+    if previous_gray is not None:
+        prev_scores[0] = difference_score(previous_gray, result["first_gray"])
+    for offset, (score, reference_index) in enumerate(overrides):
+        kept_scores[offset] = score
+        references[offset] = reference_index
+    recorder.extend(kept_scores, prev_scores, references)
+
+
+def _reconcile_segment(
+    video_path: str,
+    staging_dir: str,
+    result: Dict[str, object],
+    reference: np.ndarray,
+    reference_index: int,
+    analysis_threshold: float,
+    overrides: List[Tuple[int, int]],
+    frame_format: str = DEFAULT_FRAME_FORMAT,
+    frame_store: Optional[str] = None,
+) -> Tuple[List[int], np.ndarray]:
+    # overrides already holds the first frame's (score, reference); one entry is
+    # appended per rescanned frame so recorded scores follow the serial chain.
+    extension, write_params = frame_format_spec(frame_format)
+    start = int(result["start"])
+    end = int(result["end"])
+    worker_keys: List[int] = list(result["keyframes"])
+    worker_key_set = set(worker_keys)
+    kept: List[int] = []
+
+    cap = _open_at(video_path, start)
+    try:
+        for index in range(start, end):
+            ret, frame = cap.read()
+            if not ret:
+                raise RuntimeError(f"Unable to re-read frame {index} of {video_path}")
+            gray = analysis_gray(frame, result["analysis_size"])
+            score = difference_score(reference, gray)
+            if index > start:
+                overrides.append((score, reference_index))
+            if score >= analysis_threshold:
+                reference = gray
+                reference_index = index
+                if index in worker_key_set:
+                    return kept + [key for key in worker_keys if key >= index], result["reference"]
+                write_frame(
+                    os.path.join(staging_dir, _staged_name(index, extension)), frame, write_params, frame_store
+                )
+                kept.append(index)
+            elif index in worker_key_set:
+                remove_frame(os.path.join(staging_dir, _staged_name(index, extension)))
+    finally:
+        cap.release()
+    return kept, reference
+
+
+def _open_at(video_path: str, start: int) -> cv2.VideoCapture:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Unable to open video: {video_path}")
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    return cap
+
+
+def _staged_name(frame_index: int, extension: str) -> str:
+    return f"{frame_index:08d}{extension}"
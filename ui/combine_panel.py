@@ -5,6 +5,7 @@ from typing import List, Optional
 from PySide6.QtCore import QEasingCurve, QPropertyAnimation, Qt, Signal
 from PySide6.QtGui import QIcon, QPixmap
 from PySide6.QtWidgets import (
+    QCheckBox,
     QComboBox,
     QFileDialog,
     QFrame,
@@ -18,6 +19,8 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+PROXY_FACTOR = 4
+
 
 class ImageDropArea(QFrame):
     files_dropped = Signal(list)
@@ -88,9 +91,14 @@ class CombinePanel(QWidget):
         self.pick_folder_btn.clicked.connect(self._choose_folder)
         self.start_btn = QPushButton("开始合成")
         self.start_btn.clicked.connect(self._request_combine)
+        self.proxy_check = QCheckBox("低分辨率预览")
+        self.proxy_check.setToolTip(
+            f"以 1/{PROXY_FACTOR} 分辨率快速合成，用于检查时间节奏；输出保存在 output/proxy，不计入最终成片。"
+        )
         actions.addWidget(self.pick_images_btn)
         actions.addWidget(self.pick_folder_btn)
         actions.addWidget(self.start_btn)
+        actions.addWidget(self.proxy_check)
         actions.addStretch(1)
         root_layout.addLayout(actions)
 
@@ -220,8 +228,12 @@ class CombinePanel(QWidget):
     def selected_timing_path(self) -> str:
         return str(self.timing_combo.currentData() or "")
 
+    def proxy_factor(self) -> int:
+        return PROXY_FACTOR if self.proxy_check.isChecked() else 1
+
     def set_combine_running(self, running: bool) -> None:
         self.start_btn.setEnabled(not running)
+        self.proxy_check.setEnabled(not running)
         self.pick_images_btn.setEnabled(not running)
         self.pick_folder_btn.setEnabled(not running)
         self.browse_timing_btn.setEnabled(not running)
@@ -280,7 +292,7 @@ class CombinePanel(QWidget):
             self,
             "选择修改后的图片",
             self.current_dir,
-            "图片文件 (*.png *.jpg *.jpeg *.bmp *.webp)",
+            "图片文件 (*.png *.jpg *.jpeg *.bmp *.webp *.tif *.tiff)",
         )
         if files:
             self.images_selected.emit(files)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from PySide6.QtCore import QEasingCurve, QPropertyAnimation, QThread, QTimer, QUrl
 from PySide6.QtGui import QDesktopServices
@@ -18,7 +18,18 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
-from core import CombineTask, ExtractTask, ProjectInfo, ProjectManager
+from core import (
+    CombineTask,
+    ExtractTask,
+    FrameStoreGcTask,
+    ImageSyncTask,
+    ImportTask,
+    ProjectInfo,
+    ProjectManager,
+    RethresholdTask,
+)
+from core.extractor import timing_path_for
+from extract.scores import load_scores, rethreshold, scores_path_for
 from ui.combine_panel import CombinePanel
 from ui.project_panel import ProjectPanel
 from ui.split_panel import SplitPanel
@@ -102,6 +113,16 @@ class MainWindow(QMainWindow):
         self.extract_task: Optional[ExtractTask] = None
         self.combine_thread: Optional[QThread] = None
         self.combine_task: Optional[CombineTask] = None
+        self.rethreshold_thread: Optional[QThread] = None
+        self.rethreshold_task: Optional[RethresholdTask] = None
+        self.import_thread: Optional[QThread] = None
+        self.import_task: Optional[ImportTask] = None
+        self._importing_project: Optional[ProjectInfo] = None
+        self.sync_thread: Optional[QThread] = None
+        self.sync_task: Optional[ImageSyncTask] = None
+        self.gc_thread: Optional[QThread] = None
+        self.gc_task: Optional[FrameStoreGcTask] = None
+        self._scores_cache: Optional[Tuple[Path, float, Dict[str, object]]] = None
         self._window_fade_anim: Optional[QPropertyAnimation] = None
 
         self.setWindowTitle("XFY Reframer")
@@ -166,6 +187,8 @@ class MainWindow(QMainWindow):
         self.split_panel.video_chosen.connect(self._on_video_chosen)
         self.split_panel.start_requested.connect(self._on_start_extract)
         self.split_panel.open_frames_requested.connect(self._open_frames_folder)
+        self.split_panel.threshold_changed.connect(self._update_threshold_estimate)
+        self.split_panel.apply_threshold_requested.connect(self._on_apply_threshold)
         self.combine_panel.images_selected.connect(self._on_images_selected)
         self.combine_panel.timing_changed.connect(self._on_timing_changed)
         self.combine_panel.combine_requested.connect(self._on_start_combine)
@@ -174,7 +197,7 @@ class MainWindow(QMainWindow):
 
     def refresh_projects(self) -> None:
         projects = self.project_manager.list_projects()
-        self.project_panel.set_projects(projects)
+        self.project_panel.set_projects(projects, self.project_manager.indexed_counts())
         if self.current_project is not None:
             self.project_panel.set_current_project(self.current_project.root_dir)
 
@@ -212,6 +235,38 @@ class MainWindow(QMainWindow):
         self._set_status("项目已删除。")
         self._set_log(f"已删除项目：{target.name}")
         self._show_toast(f"已删除项目：{target.name}", "success")
+        self._start_frame_store_gc()
+
+    def _frame_store_dir(self) -> Optional[Path]:
+        return self.project_manager.frame_store_dir if self.split_panel.use_frame_store() else None
+
+    def _start_frame_store_gc(self) -> None:
+        # A collection already running, or a later deletion, picks up what this one would free.
+        if self.gc_thread is not None or not self.project_manager.frame_store_dir.exists():
+            return
+        self.gc_thread = QThread(self)
+        self.gc_task = FrameStoreGcTask(self.project_manager)
+        self.gc_task.moveToThread(self.gc_thread)
+        self.gc_thread.started.connect(self.gc_task.run)
+        self.gc_task.finished.connect(self._on_gc_finished)
+        self.gc_task.failed.connect(self._set_log)
+        self.gc_task.finished.connect(self.gc_thread.quit)
+        self.gc_task.failed.connect(self.gc_thread.quit)
+        self.gc_thread.finished.connect(self._cleanup_gc_thread)
+        self.gc_thread.start()
+
+    def _on_gc_finished(self, result: dict) -> None:
+        if result.get("removed"):
+            freed_mb = result.get("freed_bytes", 0) / (1024 * 1024)
+            self._set_log(f"帧库已清理 {result['removed']} 个文件，释放 {freed_mb:.1f} MB")
+
+    def _cleanup_gc_thread(self) -> None:
+        if self.gc_task:
+            self.gc_task.deleteLater()
+            self.gc_task = None
+        if self.gc_thread:
+            self.gc_thread.deleteLater()
+            self.gc_thread = None
 
     def _set_current_project(self, project: ProjectInfo) -> None:
         self.current_project = project
@@ -237,13 +292,11 @@ class MainWindow(QMainWindow):
             return
 
         state = self.project_manager.get_project_state(self.current_project)
-        modified_images = self.project_manager.list_images(self.current_project.modified_dir)
-        frame_images = self.project_manager.list_images(self.current_project.frames_dir)
-        self.combine_panel.set_modified_images(modified_images)
-        self.split_panel.set_frame_previews(frame_images)
+        self.combine_panel.set_modified_images(state.modified_images)
+        self.split_panel.set_frame_previews(state.frame_images)
 
-        timing_files = state["timing_files"]
-        selected = self.current_timing_path if self.current_timing_path in timing_files else state["selected_timing"]
+        timing_files = state.timing_files
+        selected = self.current_timing_path if self.current_timing_path in timing_files else state.selected_timing
         self.current_timing_path = selected
         self.combine_panel.set_timing_files(timing_files, selected=selected)
 
@@ -253,33 +306,81 @@ class MainWindow(QMainWindow):
         else:
             self.combine_panel.set_timing_info({})
 
-        latest_output = state.get("latest_output")
-        self.latest_output_path = latest_output if isinstance(latest_output, Path) else None
-        if self.latest_output_path and self.latest_output_path.exists():
+        self.latest_output_path = state.latest_output
+        if self.latest_output_path:
             self.combine_panel.open_output_btn.setEnabled(True)
             self.combine_panel.play_output_btn.setEnabled(True)
         else:
             self.combine_panel.open_output_btn.setEnabled(False)
             self.combine_panel.play_output_btn.setEnabled(False)
         self.split_panel.set_frames_dir(self.current_project.frames_dir)
+        self._update_threshold_estimate(self.split_panel.threshold_spin.value())
         self._update_step_indicator()
 
     def _on_video_chosen(self, video_path: str) -> None:
+        if self.import_thread is not None:
+            self._show_toast("正在导入视频，请稍候。", "warning")
+            return
         try:
-            project = self.project_manager.create_project_from_video(video_path)
+            project = self.project_manager.new_project(video_path)
         except Exception as exc:
             self._show_toast(f"创建项目失败：{exc}", "error")
             return
 
+        self._importing_project = project
+        self.import_thread = QThread(self)
+        self.import_task = ImportTask(self.project_manager, project, Path(video_path))
+        self.import_task.moveToThread(self.import_thread)
+        self.import_thread.started.connect(self.import_task.run)
+        self.import_task.progress.connect(self._on_import_progress)
+        self.import_task.finished.connect(self._on_import_finished)
+        self.import_task.failed.connect(self._on_import_failed)
+        self.import_task.log.connect(self._set_log)
+        self.import_task.finished.connect(self.import_thread.quit)
+        self.import_task.failed.connect(self.import_thread.quit)
+        self.import_thread.finished.connect(self._cleanup_import_thread)
+        self.import_thread.start()
+        self._set_status("正在导入视频...")
+
+    def _cleanup_import_thread(self) -> None:
+        if self.import_task:
+            self.import_task.deleteLater()
+            self.import_task = None
+        if self.import_thread:
+            self.import_thread.deleteLater()
+            self.import_thread = None
+
+    def _on_import_progress(self, copied_mb: int, total_mb: int) -> None:
+        self._set_status(f"正在复制视频... {copied_mb}/{total_mb} MB")
+
+    def _on_import_finished(self, result: dict) -> None:
+        self._importing_project = None
+        project = self.project_manager.load_project(Path(result["project_dir"]))
+        self.project_manager.update_index(project)
         self._set_current_project(project)
         self.refresh_projects()
         self._show_toast("视频已导入并创建项目。", "success")
         self._set_status("已选择视频。")
+        self._set_log(f"导入方式：{result.get('import_label', '-')}")
+
+    def _on_import_failed(self, error_message: str) -> None:
+        project, self._importing_project = self._importing_project, None
+        if project is not None:
+            try:
+                self.project_manager.delete_project(project.root_dir)
+            except Exception:
+                pass
+        self._set_status("导入失败。")
+        self._set_log(error_message)
+        self._show_toast(f"创建项目失败：{error_message}", "error")
 
     def _on_start_extract(self, threshold: int) -> None:
         if not self.current_project or not self.current_project.original_video:
             self._show_toast("请先上传视频。", "warning")
             return
+        if self.sync_thread is not None:
+            self._show_toast("正在同步修改图片，请稍候。", "warning")
+            return
 
         self.project_manager.clear_images(self.current_project.modified_dir)
         self.combine_panel.set_modified_images([])
@@ -292,6 +393,10 @@ class MainWindow(QMainWindow):
             frames_dir=self.current_project.frames_dir,
             timestamps_dir=self.current_project.timestamps_dir,
             threshold=threshold,
+            frame_format=self.split_panel.frame_format(),
+            sample_step=self.split_panel.sample_step(),
+            record_scores=self.split_panel.record_scores(),
+            frame_store=self._frame_store_dir(),
         )
         self.extract_task.moveToThread(self.extract_thread)
         self.extract_thread.started.connect(self.extract_task.run)
@@ -323,6 +428,9 @@ class MainWindow(QMainWindow):
         self.split_panel.set_split_running(False)
         self.split_panel.show_result(result)
         self.current_timing_path = Path(result.get("timing_json", "")) if result.get("timing_json") else None
+        if self.current_project:
+            self.project_manager.invalidate_project_state(self.current_project)
+            self.project_manager.update_index(self.current_project)
         self._refresh_project_views()
         self._set_status("拆帧完成。")
         self._set_log(f"已保存 {result.get('saved_frames', 0)} 张关键帧。")
@@ -334,23 +442,138 @@ class MainWindow(QMainWindow):
         self._set_log(error_message)
         self._show_toast(f"拆帧失败：{error_message}", "error")
 
+    def _load_current_scores(self) -> Optional[Dict[str, object]]:
+        if not self.current_project or not self.current_project.original_video:
+            return None
+        timing_path = timing_path_for(self.current_project.original_video, self.current_project.timestamps_dir)
+        scores_path = Path(scores_path_for(str(timing_path)))
+        if not scores_path.exists():
+            return None
+        mtime = scores_path.stat().st_mtime
+        if self._scores_cache and self._scores_cache[0] == scores_path and self._scores_cache[1] == mtime:
+            return self._scores_cache[2]
+        try:
+            scores = load_scores(str(scores_path))
+        except Exception:
+            return None
+        self._scores_cache = (scores_path, mtime, scores)
+        return scores
+
+    def _update_threshold_estimate(self, threshold: int) -> None:
+        scores = self._load_current_scores()
+        if scores is None:
+            self.split_panel.set_threshold_estimate(None)
+            return
+        plan = rethreshold(scores, threshold)
+        if plan["exact"]:
+            self.split_panel.set_threshold_estimate(int(plan["saved_frames"]))
+            return
+        # Undecidable frames kept vs dropped bracket the count; the real value needs a decode.
+        fewest = rethreshold(scores, threshold, resolver=lambda reference, frame_index: 0)
+        self.split_panel.set_threshold_estimate(int(plan["saved_frames"]), False, int(fewest["saved_frames"]))
+
+    def _on_apply_threshold(self, threshold: int) -> None:
+        if not self.current_project or not self.current_project.original_video:
+            self._show_toast("请先上传视频。", "warning")
+            return
+        if self._load_current_scores() is None:
+            self._show_toast("请先完整拆帧一次。", "warning")
+            return
+        if self.sync_thread is not None:
+            self._show_toast("正在同步修改图片，请稍候。", "warning")
+            return
+
+        self.project_manager.clear_images(self.current_project.modified_dir)
+        self.combine_panel.set_modified_images([])
+        self.split_panel.reset_progress()
+        self.split_panel.set_split_running(True)
+
+        self.rethreshold_thread = QThread(self)
+        self.rethreshold_task = RethresholdTask(
+            video_path=self.current_project.original_video,
+            frames_dir=self.current_project.frames_dir,
+            timestamps_dir=self.current_project.timestamps_dir,
+            threshold=threshold,
+            frame_store=self._frame_store_dir(),
+        )
+        self.rethreshold_task.moveToThread(self.rethreshold_thread)
+        self.rethreshold_thread.started.connect(self.rethreshold_task.run)
+        self.rethreshold_task.progress.connect(self._on_extract_progress)
+        self.rethreshold_task.finished.connect(self._on_extract_finished)
+        self.rethreshold_task.failed.connect(self._on_extract_failed)
+        self.rethreshold_task.log.connect(self._set_log)
+        self.rethreshold_task.finished.connect(self.rethreshold_thread.quit)
+        self.rethreshold_task.failed.connect(self.rethreshold_thread.quit)
+        self.rethreshold_thread.finished.connect(self._cleanup_rethreshold_thread)
+        self.rethreshold_thread.start()
+
+        self._set_status("正在按新阈值更新关键帧...")
+        self._set_log("阈值更新任务已开始。")
+
+    def _cleanup_rethreshold_thread(self) -> None:
+        if self.rethreshold_task:
+            self.rethreshold_task.deleteLater()
+            self.rethreshold_task = None
+        if self.rethreshold_thread:
+            self.rethreshold_thread.deleteLater()
+            self.rethreshold_thread = None
+
     def _on_images_selected(self, paths: List[str]) -> None:
         if not self.current_project:
             self._show_toast("请先选择或创建项目。", "warning")
             return
-        try:
-            copied = self.project_manager.replace_modified_images(self.current_project, paths)
-        except Exception as exc:
-            self._show_toast(f"导入图片失败：{exc}", "error")
+        if self.sync_thread is not None:
+            self._show_toast("正在同步修改图片，请稍候。", "warning")
             return
 
-        modified_images = self.project_manager.list_images(self.current_project.modified_dir)
-        self.combine_panel.set_modified_images(modified_images)
-        self._set_status(f"已导入 {copied} 张修改图。")
-        self._set_log("修改图片已更新。")
-        self._show_toast(f"已导入 {copied} 张图片。", "success")
+        self.sync_thread = QThread(self)
+        self.sync_task = ImageSyncTask(self.project_manager, self.current_project, paths)
+        self.sync_task.moveToThread(self.sync_thread)
+        self.sync_thread.started.connect(self.sync_task.run)
+        self.sync_task.progress.connect(self._on_sync_progress)
+        self.sync_task.finished.connect(self._on_sync_finished)
+        self.sync_task.failed.connect(self._on_sync_failed)
+        self.sync_task.log.connect(self._set_log)
+        self.sync_task.finished.connect(self.sync_thread.quit)
+        self.sync_task.failed.connect(self.sync_thread.quit)
+        self.sync_thread.finished.connect(self._cleanup_sync_thread)
+        self.sync_thread.start()
+        self._set_status("正在同步修改图片...")
+
+    def _cleanup_sync_thread(self) -> None:
+        if self.sync_task:
+            self.sync_task.deleteLater()
+            self.sync_task = None
+        if self.sync_thread:
+            self.sync_thread.deleteLater()
+            self.sync_thread = None
+
+    def _on_sync_progress(self, current: int, total: int) -> None:
+        self._set_status(f"正在同步修改图片... {current}/{total}")
+
+    def _on_sync_finished(self, result: dict) -> None:
+        if not self.current_project or str(self.current_project.root_dir) != result.get("project_dir"):
+            return
+        self.project_manager.invalidate_project_state(self.current_project)
+        state = self.project_manager.get_project_state(self.current_project)
+        self.project_manager.update_index(self.current_project)
+        self.combine_panel.set_modified_images(state.modified_images)
+        total = result.get("total", 0)
+        self._set_status(f"已导入 {total} 张修改图。")
+        self._set_log(
+            f"修改图片已同步：新增或更新 {result.get('linked', 0) + result.get('copied', 0)} 张，"
+            f"未变化 {result.get('unchanged', 0)} 张，移除 {result.get('removed', 0)} 张。"
+        )
+        self._show_toast(f"已导入 {total} 张图片。", "success")
         self._update_step_indicator()
 
+    def _on_sync_failed(self, error_message: str) -> None:
+        if self.current_project:
+            self.project_manager.invalidate_project_state(self.current_project)
+        self._set_status("导入图片失败。")
+        self._set_log(error_message)
+        self._show_toast(f"导入图片失败：{error_message}", "error")
+
     def _on_timing_changed(self, timing_path: str) -> None:
         self.current_timing_path = Path(timing_path) if timing_path else None
         if self.current_timing_path and self.current_timing_path.exists():
@@ -368,8 +591,10 @@ class MainWindow(QMainWindow):
         if not timing_path:
             self._show_toast("请选择时间文件。", "warning")
             return
-        modified_images = self.project_manager.list_images(self.current_project.modified_dir)
-        if not modified_images:
+        if self.sync_thread is not None:
+            self._show_toast("正在同步修改图片，请稍候。", "warning")
+            return
+        if not self.project_manager.get_project_state(self.current_project).modified_images:
             self._show_toast("请先上传修改后的图片。", "warning")
             return
 
@@ -389,6 +614,9 @@ class MainWindow(QMainWindow):
             modified_dir=self.current_project.modified_dir,
             output_dir=self.current_project.output_dir,
             project_name=self.current_project.name,
+            backend="ffmpeg-pipe",
+            cache_dir=self.current_project.render_cache_dir,
+            proxy_factor=self.combine_panel.proxy_factor(),
         )
         self.combine_task.moveToThread(self.combine_thread)
         self.combine_thread.started.connect(self.combine_task.run)
@@ -421,6 +649,9 @@ class MainWindow(QMainWindow):
         self.combine_panel.show_result(result)
         output_video = result.get("output_video", "")
         self.latest_output_path = Path(output_video) if output_video else None
+        if self.current_project:
+            self.project_manager.invalidate_project_state(self.current_project)
+            self.project_manager.update_index(self.current_project)
         self._set_status("合成完成。")
         self._set_log(f"输出视频已生成：{Path(output_video).name if output_video else '-'}")
         self._show_toast("合成完成。", "success")
@@ -501,15 +732,19 @@ class MainWindow(QMainWindow):
         current_step = 0
 
         if self.current_project:
-            has_video = self.current_project.original_video is not None and self.current_project.original_video.exists()
-            frame_count = len(self.project_manager.list_images(self.current_project.frames_dir))
-            modified_count = len(self.project_manager.list_images(self.current_project.modified_dir))
-            has_timing = self.current_timing_path is not None and self.current_timing_path.exists()
-            has_output = self.latest_output_path is not None and self.latest_output_path.exists()
-
-            state[0] = has_video
-            state[1] = frame_count > 0
-            state[3] = modified_count > 0
+            project_state = self.project_manager.get_project_state(self.current_project)
+            # A timing file picked from outside timestamps/ is not in the snapshot either.
+            has_timing = self.current_timing_path is not None and (
+                self.current_timing_path in project_state.timing_files or self.current_timing_path.exists()
+            )
+            # Proxies are written outside output_dir, so they are not in the snapshot.
+            has_output = self.latest_output_path is not None and (
+                self.latest_output_path in project_state.output_files or self.latest_output_path.exists()
+            )
+
+            state[0] = project_state.has_video
+            state[1] = project_state.frame_count > 0
+            state[3] = project_state.modified_count > 0
             state[2] = state[1] and state[3]
             state[4] = has_timing
             state[5] = has_output
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtWidgets import (
@@ -61,11 +61,16 @@ class ProjectPanel(QWidget):
         root_layout.addWidget(container)
         self.setMinimumWidth(260)
 
-    def set_projects(self, projects: List[ProjectInfo]) -> None:
+    def set_projects(
+        self, projects: List[ProjectInfo], counts: Optional[Dict[str, Tuple[int, int]]] = None
+    ) -> None:
         self.project_list.clear()
         for project in projects:
             item = QListWidgetItem(f"{project.display_name}\n{project.created_at}")
             item.setData(Qt.ItemDataRole.UserRole, str(project.root_dir))
+            if counts and project.name in counts:
+                frame_count, modified_count = counts[project.name]
+                item.setToolTip(f"关键帧：{frame_count} 张\n修改图：{modified_count} 张")
             self.project_list.addItem(item)
 
     def set_current_project(self, project_path: Path) -> None:
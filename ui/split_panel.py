@@ -6,6 +6,8 @@ import cv2
 from PySide6.QtCore import QEasingCurve, QPropertyAnimation, Qt, Signal
 from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import (
+    QCheckBox,
+    QComboBox,
     QFileDialog,
     QFormLayout,
     QFrame,
@@ -19,6 +21,17 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from extract.formats import DEFAULT_FRAME_FORMAT
+
+FRAME_FORMAT_CHOICES = [
+    ("PNG（默认）", "png"),
+    ("PNG 最小体积", "png-small"),
+    ("WebP 无损", "webp"),
+    ("BMP 不压缩", "bmp"),
+    ("TIFF 不压缩", "tiff"),
+]
+SAMPLED_STEP = 12
+
 
 class VideoDropArea(QFrame):
     video_dropped = Signal(str)
@@ -62,6 +75,8 @@ class SplitPanel(QWidget):
     video_chosen = Signal(str)
     start_requested = Signal(int)
     open_frames_requested = Signal()
+    threshold_changed = Signal(int)
+    apply_threshold_requested = Signal(int)
 
     def __init__(self) -> None:
         super().__init__()
@@ -156,6 +171,42 @@ class SplitPanel(QWidget):
         slider_row.addWidget(self.threshold_slider, 1)
         slider_row.addWidget(self.threshold_spin)
         sensitivity_layout.addLayout(slider_row)
+        estimate_row = QHBoxLayout()
+        estimate_row.setSpacing(10)
+        self.threshold_estimate_label = QLabel("预计关键帧：-")
+        self.threshold_estimate_label.setProperty("role", "metric")
+        self.apply_threshold_btn = QPushButton("快速应用阈值")
+        self.apply_threshold_btn.setProperty("class", "secondary")
+        self.apply_threshold_btn.setEnabled(False)
+        self.apply_threshold_btn.clicked.connect(
+            lambda: self.apply_threshold_requested.emit(self.threshold_spin.value())
+        )
+        estimate_row.addWidget(self.threshold_estimate_label, 1)
+        estimate_row.addWidget(self.apply_threshold_btn)
+        sensitivity_layout.addLayout(estimate_row)
+        format_row = QHBoxLayout()
+        format_row.setSpacing(10)
+        format_row.addWidget(QLabel("关键帧格式"))
+        self.frame_format_combo = QComboBox()
+        for label, frame_format in FRAME_FORMAT_CHOICES:
+            self.frame_format_combo.addItem(label, frame_format)
+        self.frame_format_combo.setToolTip("均为无损格式：压缩越快体积越大，BMP/TIFF 适合临时盘。")
+        format_row.addWidget(self.frame_format_combo, 1)
+        self.sampled_check = QCheckBox("长静止镜头快速模式")
+        self.sampled_check.setToolTip(
+            f"每 {SAMPLED_STEP} 帧比较一次，有变化时再二分定位到具体帧；适合字幕卡、静止镜头多的视频，不支持快速应用阈值。"
+        )
+        format_row.addWidget(self.sampled_check)
+        self.record_scores_check = QCheckBox("记录帧差分数")
+        self.record_scores_check.setChecked(True)
+        self.record_scores_check.setToolTip("用于快速应用阈值；关闭后每帧比较达到阈值即停止，拆帧更快。")
+        format_row.addWidget(self.record_scores_check)
+        self.frame_store_check = QCheckBox("共享帧库")
+        self.frame_store_check.setToolTip(
+            "相同画面在所有项目中只保存一份，重复拆帧写入更少；关键帧为只读链接，修改请另存到其他文件夹。"
+        )
+        format_row.addWidget(self.frame_store_check)
+        sensitivity_layout.addLayout(format_row)
         root_layout.addWidget(sensitivity)
 
         progress = QFrame()
@@ -206,6 +257,7 @@ class SplitPanel(QWidget):
             self.threshold_spin.blockSignals(True)
             self.threshold_spin.setValue(mapped)
             self.threshold_spin.blockSignals(False)
+        self.threshold_changed.emit(self.threshold_spin.value())
 
     def _sync_spin_to_slider(self, value: int) -> None:
         mapped = max(1, min(500, int(value / 10_000)))
@@ -213,6 +265,7 @@ class SplitPanel(QWidget):
             self.threshold_slider.blockSignals(True)
             self.threshold_slider.setValue(mapped)
             self.threshold_slider.blockSignals(False)
+        self.threshold_changed.emit(value)
 
     def set_video(self, video_path: Path) -> None:
         self.video_path = Path(video_path)
@@ -256,9 +309,40 @@ class SplitPanel(QWidget):
         self.frames_dir = Path(frames_dir)
         self.open_folder_btn.setEnabled(True)
 
+    def set_threshold_estimate(self, count: Optional[int], exact: bool = True, fewest: Optional[int] = None) -> None:
+        if count is None:
+            self.threshold_estimate_label.setText("预计关键帧：-")
+            self.apply_threshold_btn.setEnabled(False)
+            return
+        if exact:
+            text = f"{count} 张"
+        elif fewest is not None and fewest < count:
+            text = f"约 {fewest}-{count} 张（需解码确认）"
+        else:
+            text = f"约 {count} 张"
+        self.threshold_estimate_label.setText(f"预计关键帧：{text}")
+        self.apply_threshold_btn.setEnabled(self.start_btn.isEnabled())
+
+    def frame_format(self) -> str:
+        return self.frame_format_combo.currentData() or DEFAULT_FRAME_FORMAT
+
+    def sample_step(self) -> int:
+        return SAMPLED_STEP if self.sampled_check.isChecked() else 1
+
+    def record_scores(self) -> bool:
+        return self.record_scores_check.isChecked()
+
+    def use_frame_store(self) -> bool:
+        return self.frame_store_check.isChecked()
+
     def set_split_running(self, running: bool) -> None:
         self.start_btn.setEnabled(not running)
         self.pick_video_btn.setEnabled(not running)
+        self.frame_format_combo.setEnabled(not running)
+        self.sampled_check.setEnabled(not running)
+        self.record_scores_check.setEnabled(not running)
+        self.frame_store_check.setEnabled(not running)
+        self.apply_threshold_btn.setEnabled(not running and self.threshold_estimate_label.text() != "预计关键帧：-")
         self.start_btn.setText("拆帧中..." if running else "开始拆帧")
         self.start_btn.setProperty("state", "loading" if running else "")
         self.start_btn.style().unpolish(self.start_btn)
@@ -309,6 +393,7 @@ class SplitPanel(QWidget):
         self.thumbnail_label.setPixmap(QPixmap())
         self.thumbnail_label.setText("暂无预览")
         self.set_frame_previews([])
+        self.set_threshold_estimate(None)
         self.reset_progress()
 
     def _animate_progress(self, target_value: int) -> None: